@@ -1,8 +1,4 @@
-import logging
+from .config import config
+from . import log
 
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="%(asctime)s [%(levelname)-8s] - (%(funcName)s@%(filename)s:%(lineno)d): %(message)s",
-    filename="fanbase.log",
-    filemode="a",
-)
+log.configure(config)
@@ -1,11 +1,15 @@
-__all__ = ["api_system_bp", "api_person", "api_quotes", "api_wiki"]
+__all__ = ["api_system_bp", "api_person", "api_quotes", "api_wiki", "api_search", "api_bulk", "api_stream", "api_batch"]
 
 from quart import Blueprint
 
-from . import api_person, api_quotes, api_wiki
+from . import api_person, api_quotes, api_wiki, api_search, api_bulk, api_stream, api_batch
 
 api_system_bp = Blueprint("api", __name__)
 
 api_system_bp.register_blueprint(api_person.get_person_bp)
 api_system_bp.register_blueprint(api_quotes.get_quotes_bp)
 api_system_bp.register_blueprint(api_wiki.wiki_bp)
+api_system_bp.register_blueprint(api_search.search_bp)
+api_system_bp.register_blueprint(api_bulk.bulk_bp)
+api_system_bp.register_blueprint(api_stream.stream_bp)
+api_system_bp.register_blueprint(api_batch.batch_bp)
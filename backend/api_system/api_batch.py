@@ -0,0 +1,118 @@
+import asyncio
+import contextvars
+import logging
+from urllib.parse import unquote, urlsplit
+
+from quart import Blueprint, current_app, jsonify, request
+from werkzeug.datastructures import Headers
+from werkzeug.exceptions import HTTPException
+
+batch_bp = Blueprint("batch", __name__)
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_REQUESTS = 20
+# Сколько подзапросов одного пакета выполняется одновременно (и держит соединения с БД)
+BATCH_CONCURRENCY = 8
+
+# Только чтение с конечным JSON-ответом: без записей, потоков, файлов и вложенных пакетов
+BATCH_ENDPOINTS = {
+    "api.get_person.api_get_person",
+    "api.get_quotes.api_get_quotes",
+    "api.get_quotes.api_get_all_quote",
+    "api.search.api_search",
+    "api.wiki.get_wiki",
+    "api.wiki.get_wiki_images",
+}
+# Без limit эти endpoint отдают таблицу целиком: в пакете они разрешены только постранично
+PAGED_ENDPOINTS = {
+    "api.get_quotes.api_get_all_quote",
+}
+# Заголовки пакета, которые не относятся к подзапросам
+_DROPPED_HEADERS = (
+    "Content-Length", "Content-Type", "Transfer-Encoding", "Accept", "Accept-Encoding",
+    "If-None-Match", "If-Modified-Since",
+)
+
+async def _no_push_promise(path, headers) -> None:
+    pass
+
+def _error(status: int, message: str) -> dict:
+    return {"status": status, "body": {"error": message, "status": status}}
+
+def _make_request(app, parent, path: str, query_string: bytes):
+    headers = Headers(parent.headers)
+    for name in _DROPPED_HEADERS:
+        headers.remove(name)
+    scope = {
+        **parent.scope,
+        "method": "GET",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query_string,
+    }
+    sub_request = app.request_class(
+        "GET", parent.scheme, path, query_string, headers, parent.root_path, parent.http_version,
+        scope=scope, send_push_promise=_no_push_promise,
+    )
+    sub_request.body.set_result(b"")
+    return sub_request
+
+async def _dispatch(app, sub_request) -> dict:
+    """Выполнить подзапрос со всеми обработчиками before/after_request"""
+    try:
+        rule, _ = app.create_url_adapter(sub_request).match(return_rule=True)
+    except HTTPException as e:
+        return _error(e.code, e.name)
+    if rule.endpoint not in BATCH_ENDPOINTS:
+        return _error(400, f"{sub_request.path} is not allowed in batch")
+    if rule.endpoint in PAGED_ENDPOINTS and "limit" not in sub_request.args:
+        return _error(400, f"{sub_request.path} requires limit in batch")
+
+    async with app.request_context(sub_request) as request_context:
+        response = await app.full_dispatch_request(request_context)
+        if response.is_json:
+            body = await response.get_json()
+        else:
+            body = await response.get_data(as_text=True)
+    return {"status": response.status_code, "body": body}
+
+@batch_bp.route("/api/v1/batch", methods=["POST"])
+async def api_batch():
+    payload = await request.get_json(silent=True)
+    items = payload.get("requests") if isinstance(payload, dict) else None
+
+    if not isinstance(items, list) or not items:
+        return jsonify({
+            "error": "requests must be a non-empty list",
+            "status": 400
+        }), 400
+
+    if len(items) > MAX_BATCH_REQUESTS:
+        return jsonify({
+            "error": f"At most {MAX_BATCH_REQUESTS} requests per batch",
+            "status": 400
+        }), 400
+
+    app = current_app._get_current_object()
+    parent = request._get_current_object()
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def run(item) -> dict:
+        path = item.get("path") if isinstance(item, dict) else None
+        if not isinstance(path, str) or not path.startswith("/api/v1/"):
+            return _error(400, "path must be an /api/v1/ URL")
+        url = urlsplit(path)
+        sub_request = _make_request(app, parent, unquote(url.path), url.query.encode())
+        async with semaphore:
+            try:
+                return await _dispatch(app, sub_request)
+            except Exception as e:
+                logger.error(f"Error in batch request {path}: {e}")
+                return _error(500, str(e))
+
+    # Каждый подзапрос в своем контексте: свои g, сессия и маршрутизация чтений
+    tasks = [asyncio.create_task(run(item), context=contextvars.Context()) for item in items]
+    return jsonify({
+        "responses": await asyncio.gather(*tasks),
+        "status": 200
+    })
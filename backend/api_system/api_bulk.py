@@ -0,0 +1,92 @@
+import hashlib
+import io
+import logging
+
+from quart import Blueprint, Response, jsonify, request
+
+from backend import bulk
+from backend.config import config
+from backend.database import Bulk_operation
+
+bulk_bp = Blueprint("bulk", __name__)
+logger = logging.getLogger(__name__)
+
+ADMIN_PASSWORD_HEADER = "X-Admin-Password"
+
+def _is_admin() -> bool:
+    password = request.headers.get(ADMIN_PASSWORD_HEADER, "")
+    return hashlib.sha3_512(password.encode()).hexdigest() == config.admin_password
+
+def _forbidden():
+    return jsonify({
+        "error": "Admin password required",
+        "status": 403
+    }), 403
+
+def _request_format():
+    fmt = request.args.get("format")
+    if fmt is None:
+        fmt = bulk.format_from_mimetype(request.mimetype)
+    return fmt if fmt in bulk.FORMATS else None
+
+@bulk_bp.route("/api/v1/bulk/import", methods=["POST"])
+async def bulk_import():
+    """Импорт персон и цитат из CSV или JSONL в теле запроса"""
+    if not _is_admin():
+        return _forbidden()
+
+    fmt = _request_format()
+    if fmt is None:
+        return jsonify({
+            "error": f"format must be one of: {', '.join(bulk.FORMATS)}",
+            "status": 400
+        }), 400
+
+    batch_size = request.args.get("batch_size", Bulk_operation.DEFAULT_BATCH_SIZE, type=int)
+    if batch_size < 1:
+        return jsonify({
+            "error": "batch_size must be >= 1",
+            "status": 400
+        }), 400
+
+    body = await request.get_data(as_text=True)
+    try:
+        stats = await Bulk_operation.import_rows(
+            bulk.read_rows(io.StringIO(body, newline=""), fmt), batch_size=batch_size
+        )
+    except ValueError as e:
+        return jsonify({
+            "error": str(e),
+            "status": 400
+        }), 400
+    except Exception as e:
+        logger.error(f"Error during bulk import: {e}")
+        return jsonify({
+            "error": str(e),
+            "status": 500
+        }), 500
+
+    logger.info(f"Bulk import: {stats.as_dict()}")
+    return jsonify({**stats.as_dict(), "status": 200})
+
+async def _export_lines(fmt: str):
+    yield bulk.dump_header(fmt)
+    async for full_name, quote in Bulk_operation.stream_export():
+        yield bulk.dump_row(full_name, quote, fmt)
+
+@bulk_bp.route("/api/v1/bulk/export", methods=["GET"])
+async def bulk_export():
+    """Потоковая выгрузка всех персон и цитат"""
+    if not _is_admin():
+        return _forbidden()
+
+    fmt = request.args.get("format", bulk.FORMAT_JSONL)
+    if fmt not in bulk.FORMATS:
+        return jsonify({
+            "error": f"format must be one of: {', '.join(bulk.FORMATS)}",
+            "status": 400
+        }), 400
+
+    response = Response(_export_lines(fmt), mimetype=bulk.MIMETYPES[fmt])
+    response.headers["Content-Disposition"] = f"attachment; filename=fanbase.{fmt}"
+    return response
@@ -3,6 +3,7 @@ import logging
 from quart import Blueprint, jsonify, request
 
 from backend.database import Person_operation
+from .params import MAX_IDS, get_id_list
 
 get_person_bp = Blueprint("get_person", __name__)
 logger = logging.getLogger(__name__)
@@ -10,8 +11,18 @@ logger = logging.getLogger(__name__)
 @get_person_bp.route("/api/v1/get_person", methods=["GET"])
 async def api_get_person():
     full_name = request.args.get('full_name', type=str)
-    person_id = request.args.get('person_id', type=int)
-    
+    person_ids = get_id_list(request.args, 'person_id')
+
+    if person_ids is None:
+        return jsonify({
+            "error": f"person_id must be a list of at most {MAX_IDS} integers",
+            "status": 400
+        }), 400
+
+    if len(person_ids) > 1:
+        return await _get_persons(person_ids)
+
+    person_id = person_ids[0] if person_ids else None
     if not full_name and not person_id:
         return jsonify({
             "error": "full_name or person_id is required",
@@ -45,3 +56,30 @@ async def api_get_person():
             "error": str(e),
             "status": 500
         }), 500
+
+async def _get_persons(person_ids):
+    """Несколько персон одним запросом IN; ненайденные id перечислены в not_found"""
+    try:
+        persons = await Person_operation.get_persons_by_ids(person_ids)
+        if not persons:
+            return jsonify({
+                "error": "No found person",
+                "status": 404
+            }), 404
+
+        return jsonify({
+            "person": [
+                {
+                    "id": persons[person_id].id,
+                    "full_name": persons[person_id].full_name
+                } for person_id in person_ids if person_id in persons
+            ],
+            "not_found": [person_id for person_id in person_ids if person_id not in persons],
+            "status": 200
+        })
+
+    except Exception as e:
+        return jsonify({
+            "error": str(e),
+            "status": 500
+        }), 500
@@ -1,16 +1,33 @@
+import json
 import logging
 
-from quart import Blueprint, jsonify, request
+from quart import Blueprint, Response, jsonify, request
 
-from backend.database import Quotes_operation
+from backend import http_cache
+from backend.database import Person_operation, Quotes_operation
+from .params import MAX_IDS, get_id_list
 
 get_quotes_bp = Blueprint("get_quotes", __name__)
 logger = logging.getLogger(__name__)
 
+NDJSON_MIMETYPE = "application/x-ndjson"
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+
 @get_quotes_bp.route("/api/v1/get_quotes", methods=["GET"])
 async def api_get_quotes():
-    person_id = request.args.get('person_id', type=int)
-    
+    person_ids = get_id_list(request.args, 'person_id')
+
+    if person_ids is None:
+        return jsonify({
+            "error": f"person_id must be a list of at most {MAX_IDS} integers",
+            "status": 400
+        }), 400
+
+    if len(person_ids) > 1:
+        return await _get_quotes_by_persons(person_ids)
+
+    person_id = person_ids[0] if person_ids else None
     if not person_id:
         return jsonify({
             "error": "person_id is required",
@@ -18,6 +35,12 @@ async def api_get_quotes():
         }), 400
     
     try:
+        person = await Person_operation.get_person_by_id(person_id)
+        if person is not None:
+            etag = http_cache.make_etag("quotes", person.id, person.version)
+            if (response := http_cache.not_modified(etag, person.updated_at)) is not None:
+                return response
+
         quotes = await Quotes_operation.get_all_quote_by_person(person_id)
         
         if not quotes:
@@ -26,7 +49,7 @@ async def api_get_quotes():
                 "status": 404
             }), 404
         
-        return jsonify({
+        response = jsonify({
             "quotes": [
                 {
                     "id": quote.id,
@@ -36,6 +59,9 @@ async def api_get_quotes():
             ],
             "status": 200
         })
+        if person is not None:
+            http_cache.set_validators(response, etag, person.updated_at)
+        return response
     
     except Exception as e:
         return jsonify({
@@ -43,8 +69,109 @@ async def api_get_quotes():
             "status": 500
         }), 500
     
+async def _get_quotes_by_persons(person_ids):
+    """Цитаты нескольких персон: один запрос IN, ответ сгруппирован по персоне в порядке запроса"""
+    try:
+        persons = await Person_operation.get_persons_by_ids(person_ids)
+        # Валидаторы только если известны версии всех персон ответа
+        etag = None
+        if len(persons) == len(person_ids):
+            etag = http_cache.make_etag(
+                "quotes", *(f"{person_id}.{persons[person_id].version}" for person_id in person_ids)
+            )
+            last_modified = max(
+                (person.updated_at for person in persons.values() if person.updated_at is not None),
+                default=None,
+            )
+            if (response := http_cache.not_modified(etag, last_modified)) is not None:
+                return response
+
+        quotes_by_person = await Quotes_operation.get_quotes_by_persons(person_ids)
+
+        if not quotes_by_person:
+            return jsonify({
+                "error": "No quotes found for these persons",
+                "status": 404
+            }), 404
+
+        response = jsonify({
+            "persons": [
+                {
+                    "person_id": person_id,
+                    "quotes": [
+                        {
+                            "id": quote.id,
+                            "quote": quote.quote,
+                            "person_id": quote.person_id
+                        } for quote in quotes_by_person.get(person_id, ())
+                    ]
+                } for person_id in person_ids
+            ],
+            "status": 200
+        })
+        if etag is not None:
+            http_cache.set_validators(response, etag, last_modified)
+        return response
+
+    except Exception as e:
+        return jsonify({
+            "error": str(e),
+            "status": 500
+        }), 500
+
+def _wants_ndjson() -> bool:
+    best = request.accept_mimetypes.best_match(["application/json", NDJSON_MIMETYPE])
+    return best == NDJSON_MIMETYPE
+
+async def _ndjson_quotes(after_id: int, limit):
+    async for quote in Quotes_operation.stream_all_quote(after_id=after_id, limit=limit):
+        yield json.dumps({
+            "id": quote.id,
+            "quote": quote.quote,
+            "person_id": quote.person_id
+        }, ensure_ascii=False) + "\n"
+
 @get_quotes_bp.route("/api/v1/get_all_quote", methods=["GET"])
 async def api_get_all_quote():
+    after_id = request.args.get('after_id', type=int)
+    limit = request.args.get('limit', type=int)
+
+    if (after_id is not None and after_id < 0) or (limit is not None and limit < 1):
+        return jsonify({
+            "error": "after_id must be >= 0 and limit must be >= 1",
+            "status": 400
+        }), 400
+
+    # Потоковая выдача: строки уходят клиенту по мере чтения из курсора
+    if _wants_ndjson():
+        return Response(_ndjson_quotes(after_id or 0, limit), mimetype=NDJSON_MIMETYPE)
+
+    # Постраничная выдача по курсору after_id
+    if after_id is not None or limit is not None:
+        limit = min(limit or DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT)
+        try:
+            quotes = await Quotes_operation.get_quotes_page(after_id=after_id or 0, limit=limit)
+            if quotes is None:
+                raise RuntimeError("Error getting quotes page")
+
+            return jsonify({
+                "quotes": [
+                    {
+                        "id": quote.id,
+                        "quote": quote.quote,
+                        "person_id": quote.person_id
+                    } for quote in quotes
+                ],
+                "next_after_id": quotes[-1].id if len(quotes) == limit else None,
+                "status": 200
+            })
+
+        except Exception as e:
+            return jsonify({
+                "error": str(e),
+                "status": 500
+            }), 500
+
     try:
         quotes = await Quotes_operation.get_all_quote()
         
@@ -0,0 +1,50 @@
+import logging
+
+from quart import Blueprint, jsonify, request
+
+from backend.database import Search_operation
+
+search_bp = Blueprint("search", __name__)
+logger = logging.getLogger(__name__)
+
+MAX_PER_PAGE = 100
+
+@search_bp.route("/api/v1/search", methods=["GET"])
+async def api_search():
+    query = request.args.get('q', type=str)
+    kind = request.args.get('kind', type=str)
+    page = request.args.get('page', default=1, type=int)
+    per_page = request.args.get('per_page', default=20, type=int)
+
+    if not query or not query.strip():
+        return jsonify({
+            "error": "q is required",
+            "status": 400
+        }), 400
+
+    if kind and kind not in Search_operation.KINDS:
+        return jsonify({
+            "error": f"kind must be one of: {', '.join(Search_operation.KINDS)}",
+            "status": 400
+        }), 400
+
+    page = max(page, 1)
+    per_page = min(max(per_page, 1), MAX_PER_PAGE)
+
+    try:
+        found = await Search_operation.search(query, kind=kind, page=page, per_page=per_page)
+
+        return jsonify({
+            "results": found["results"],
+            "total": found["total"],
+            "page": page,
+            "per_page": per_page,
+            "status": 200
+        })
+
+    except Exception as e:
+        logger.error(f"Error during search: {e}")
+        return jsonify({
+            "error": str(e),
+            "status": 500
+        }), 500
@@ -0,0 +1,91 @@
+import json
+import logging
+
+from quart import Blueprint, Response, jsonify, request, websocket
+
+from backend import broadcast
+from backend.config import config
+from backend.database import Person_operation
+
+stream_bp = Blueprint("stream", __name__)
+logger = logging.getLogger(__name__)
+
+SSE_MIMETYPE = "text/event-stream"
+# Через сколько миллисекунд EventSource переподключается после обрыва
+SSE_RETRY_MS = 3000
+SSE_HEARTBEAT = b": heartbeat\n\n"
+WS_HEARTBEAT = '{"event": "heartbeat"}'
+
+async def _check_subscription(person_id):
+    """Ответ с ошибкой, если подписаться нельзя, иначе None"""
+    if broadcast.hub.subscriber_count >= config.stream_max_subscribers:
+        logger.warning(f"Quote stream rejected: {config.stream_max_subscribers} subscribers already connected")
+        return jsonify({
+            "error": "Too many stream subscribers",
+            "status": 503
+        }), 503
+
+    if person_id is not None and await Person_operation.get_person_by_id(person_id) is None:
+        return jsonify({
+            "error": "No found person",
+            "status": 404
+        }), 404
+    return None
+
+def _dropped_payload(dropped: int) -> str:
+    return json.dumps({"count": dropped})
+
+async def _sse_events(person_id):
+    yield f"retry: {SSE_RETRY_MS}\n\n".encode()
+    with broadcast.hub.subscribe(person_id) as subscriber:
+        while (messages := await subscriber.get()) is not None:
+            if not messages:
+                yield SSE_HEARTBEAT
+                continue
+            chunk = b"".join(message.sse for message in messages)
+            if dropped := subscriber.take_dropped():
+                # Клиент пропустил события и должен перечитать цитаты целиком
+                chunk = f"event: dropped\ndata: {_dropped_payload(dropped)}\n\n".encode() + chunk
+            yield chunk
+
+@stream_bp.route("/api/v1/stream/quotes", methods=["GET"])
+async def api_stream_quotes():
+    person_id = request.args.get('person_id', type=int)
+
+    try:
+        if (error := await _check_subscription(person_id)) is not None:
+            return error
+    except Exception as e:
+        return jsonify({
+            "error": str(e),
+            "status": 500
+        }), 500
+
+    response = Response(_sse_events(person_id), mimetype=SSE_MIMETYPE)
+    response.headers["Cache-Control"] = "no-cache"
+    # Запрещает nginx буферизовать поток
+    response.headers["X-Accel-Buffering"] = "no"
+    # Поток открыт, пока клиент не отключится: RESPONSE_TIMEOUT к нему не относится
+    response.timeout = None
+    return response
+
+@stream_bp.websocket("/api/v1/stream/quotes/ws")
+async def ws_stream_quotes():
+    person_id = websocket.args.get('person_id', type=int)
+
+    # До accept ошибка уходит клиенту обычным HTTP-ответом
+    if (error := await _check_subscription(person_id)) is not None:
+        return error
+
+    await websocket.accept()
+    with broadcast.hub.subscribe(person_id) as subscriber:
+        while (messages := await subscriber.get()) is not None:
+            if not messages:
+                await websocket.send(WS_HEARTBEAT)
+                continue
+            if dropped := subscriber.take_dropped():
+                await websocket.send(f'{{"event": "dropped", "data": {_dropped_payload(dropped)}}}')
+            for message in messages:
+                await websocket.send(message.text)
+    # Истек срок жизни потока или хаб остановлен: клиент должен переподключиться
+    await websocket.close(1001)
@@ -1,8 +1,10 @@
 import logging
-import os
-from quart import Blueprint, jsonify, request, current_app, send_file
+from quart import Blueprint, Response, jsonify, request, current_app
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
 from werkzeug.utils import secure_filename
 
+from backend import http_cache, images
+from backend.file_body import PreadFileBody
 from backend.database import WIKI_operation
 
 wiki_bp = Blueprint("wiki", __name__)
@@ -12,35 +14,22 @@ logger = logging.getLogger(__name__)
 async def get_wiki(wiki_id: int):
     """Получить wiki по ID с изображениями"""
     try:
-        wiki_data = await WIKI_operation.get_wiki_with_images(wiki_id)
-        if not wiki_data:
+        wiki = await WIKI_operation.get_wiki_view(wiki_id=wiki_id)
+        if wiki is None:
             return jsonify({
                 "error": "Wiki not found",
                 "status": 404
             }), 404
-        
-        return jsonify({
-            "wiki": {
-                "id": wiki_data['id'],
-                "person_id": wiki_data['person_id'],
-                "description": wiki_data['description'],
-                "created_at": wiki_data['created_at'].isoformat() if wiki_data['created_at'] else None,
-                "updated_at": wiki_data['updated_at'].isoformat() if wiki_data['updated_at'] else None,
-                "created_by": wiki_data['created_by'],
-                "images": [
-                    {
-                        "id": img.id,
-                        "filename": img.filename,
-                        "original_filename": img.original_filename,
-                        "file_size": img.file_size,
-                        "mime_type": img.mime_type,
-                        "uploaded_at": img.uploaded_at.isoformat() if img.uploaded_at else None,
-                        "uploaded_by": img.uploaded_by
-                    } for img in wiki_data['images']
-                ]
-            },
+
+        etag = http_cache.make_etag("wiki", wiki.id, wiki.updated_at, *(image.id for image in wiki.images))
+        if (response := http_cache.not_modified(etag, wiki.updated_at)) is not None:
+            return response
+
+        response = jsonify({
+            "wiki": wiki.as_dict(),
             "status": 200
         })
+        return http_cache.set_validators(response, etag, wiki.updated_at)
     
     except Exception as e:
         logger.error(f"Error getting wiki: {e}")
@@ -57,15 +46,7 @@ async def update_wiki(wiki_id: int):
         description = data.get('description')
         updated_by = data.get('updated_by', 'anonymous')
         
-        # Обрезаем лишние пробелы, но сохраняем переносы строк
-        if description:
-            # Обрабатываем каждую строку отдельно, чтобы сохранить переносы
-            lines = description.strip().split('\n')
-            # Убираем лишние пробелы в каждой строке, но сохраняем пустые строки для переносов
-            processed_lines = []
-            for line in lines:
-                processed_lines.append(' '.join(line.split()) if line.strip() else '')
-            description = '\n'.join(processed_lines)
+        description = WIKI_operation.normalize_description(description)
         
         if not description:
             return jsonify({
@@ -182,37 +163,58 @@ async def delete_wiki_image(image_id: int):
 @wiki_bp.route("/api/v1/wiki/images/<int:image_id>/file", methods=["GET"])
 async def get_wiki_image_file(image_id: int):
     """Получить файл изображения"""
+    size = request.args.get('size', images.ORIGINAL_SIZE)
+    if size not in images.SIZES:
+        return jsonify({
+            "error": f"size must be one of: {', '.join(images.SIZES)}",
+            "status": 400
+        }), 400
+    accepts_webp = "image/webp" in request.headers.get("Accept", "")
+
     try:
-        # Получаем информацию об изображении
-        async with WIKI_operation.async_session() as session:
-            from backend.database.database import WikiImage
-            from sqlalchemy import select
-            
-            query = select(WikiImage).where(WikiImage.id == image_id)
-            result = await session.execute(query)
-            wiki_image = result.scalar_one_or_none()
-            
-            if not wiki_image:
-                return jsonify({
-                    "error": "Image not found",
-                    "status": 404
-                }), 404
-            
-            # Проверяем существование файла
-            if not os.path.exists(wiki_image.file_path):
-                return jsonify({
-                    "error": "Image file not found",
-                    "status": 404
-                }), 404
-            
-            # Отправляем файл
-            return await send_file(
-                wiki_image.file_path,
-                mimetype=wiki_image.mime_type,
-                as_attachment=False,
-                attachment_filename=wiki_image.original_filename
-            )
-    
+        # Метаданные берутся из кэша, БД опрашивается только при промахе
+        image_files = await WIKI_operation.get_image_files(image_id)
+        if image_files is None:
+            return jsonify({
+                "error": "Image not found",
+                "status": 404
+            }), 404
+
+        file_path, mime_type, file_size = image_files.choose(size, accepts_webp)
+        body = PreadFileBody(file_path, file_size)
+        response = Response(body, mimetype=mime_type)
+        response.content_length = file_size
+        response.accept_ranges = "bytes"
+        response.set_etag(http_cache.make_etag(image_id, file_path, file_size))
+        response.last_modified = image_files.uploaded_at
+        response.vary.add("Accept")
+        # Файлы под одним id не меняются: новое содержимое получает новый id
+        http_cache.set_immutable(response)
+
+        # Range, If-Range, If-None-Match и If-Modified-Since
+        await response.make_conditional(request, accept_ranges=True, complete_length=file_size)
+        if response.status_code not in (200, 206):
+            return response
+
+        if request.method == "HEAD":
+            # Тело не читаем, Content-Length остается от полного ответа
+            content_length = response.content_length
+            response.set_data(b"")
+            response.content_length = content_length
+            return response
+
+        try:
+            await body.open()
+        except FileNotFoundError:
+            WIKI_operation.forget_image_files(image_id)
+            return jsonify({
+                "error": "Image file not found",
+                "status": 404
+            }), 404
+        return response
+
+    except RequestedRangeNotSatisfiable:
+        raise
     except Exception as e:
         logger.error(f"Error getting image file: {e}")
         return jsonify({
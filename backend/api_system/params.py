@@ -0,0 +1,26 @@
+from typing import Optional
+
+# Больше id в одном запросе не принимается: список уходит в один IN (...)
+MAX_IDS = 100
+
+
+def get_id_list(args, name: str) -> Optional[list]:
+    """
+    Список id из параметра запроса: повторяющегося (?person_id=1&person_id=2)
+    и/или через запятую (?person_id=1,2). Порядок сохраняется, повторы убираются.
+    Возвращает None, если значение не число или id больше MAX_IDS.
+    """
+    ids = []
+    for value in args.getlist(name):
+        for part in value.split(","):
+            part = part.strip()
+            if not part:
+                continue
+            try:
+                ids.append(int(part))
+            except ValueError:
+                return None
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > MAX_IDS:
+        return None
+    return ids
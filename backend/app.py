@@ -0,0 +1,126 @@
+import logging
+import os
+import time
+
+from quart import Quart, Response, g, request
+
+from .config import config
+from .database import database, pool, replicas, unit_of_work, write_queue, Search_operation
+from .api_system import api_system_bp
+from .pages import pages_bp
+from . import assets, broadcast, compression, images, metrics
+
+logger = logging.getLogger(__name__)
+
+
+async def open_unit_of_work():
+    # Все операции запроса работают в одной сессии и одной транзакции
+    g.pool_checkouts = pool.count_checkouts()
+    g.unit_of_work = unit_of_work.begin_scope()
+
+async def commit_unit_of_work(response):
+    token = g.pop("unit_of_work", None)
+    if token is not None:
+        await unit_of_work.end_scope(token, commit=response.status_code < 500)
+    return response
+
+async def close_unit_of_work(exc):
+    # Сюда попадаем и после необработанного исключения: транзакция откатывается
+    token = g.pop("unit_of_work", None)
+    if token is not None:
+        await unit_of_work.end_scope(token, commit=False)
+    if "pool_checkouts" in g:
+        logger.debug(
+            f"{request.method} {request.path}: {g.pool_checkouts.count} pool checkouts",
+            extra={"sample": True},
+        )
+
+async def route_reads():
+    # Клиент недавно писал: его чтения идут в основную базу, пока реплики не догонят
+    g.read_routing = replicas.route_request(read_primary=replicas.PRIMARY_COOKIE in request.cookies)
+
+async def remember_writes(response):
+    routing = g.get("read_routing")
+    if routing is not None and routing.wrote:
+        response.set_cookie(
+            replicas.PRIMARY_COOKIE, "1",
+            max_age=config.database_replica_lag_seconds, httponly=True, samesite="Lax",
+        )
+    return response
+
+async def start_request_timer():
+    g.request_started = time.perf_counter()
+
+async def record_request_metrics(response):
+    started = g.get("request_started")
+    if started is not None:
+        # Для потоковых ответов учитывается время до начала отправки тела
+        metrics.observe_request(
+            request.endpoint or "unmatched", request.method, response.status_code,
+            time.perf_counter() - started,
+        )
+    return response
+
+async def metrics_view():
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+# Выставляется server.run, когда схема уже подготовлена до запуска процессов
+SCHEMA_READY_ENV = "FANBASE_SCHEMA_READY"
+
+async def prepare_database():
+    """Создать недостающие таблицы, колонки и поисковый индекс"""
+    await database.init_db()
+    await Search_operation.init_search_index()
+
+async def startup():
+    if os.environ.get(SCHEMA_READY_ENV) != "1":
+        await prepare_database()
+    await replicas.replica_set.start()
+
+async def shutdown():
+    await broadcast.hub.stop()
+    await write_queue.stop()
+    await replicas.replica_set.stop()
+    images.shutdown()
+
+def create_app() -> Quart:
+    """Собрать ASGI-приложение: страницы, API и обработчики жизненного цикла"""
+    app = Quart(
+        __name__,
+        static_folder="../frontend/static",
+        template_folder="../frontend/templates",
+    )
+
+    app.register_blueprint(api_system_bp)
+    app.register_blueprint(pages_bp)
+    app.register_blueprint(assets.assets_bp)
+
+    # В режиме отладки статика отдается как есть, чтобы правки были видны без сборки
+    if not config.debug_mode:
+        assets.load_manifest()
+    app.add_template_global(assets.asset_url)
+
+    # Зарегистрирован первым, поэтому выполняется последним из after_request
+    if config.compression_enabled:
+        app.after_request(compression.compress_response)
+
+    if config.metrics_enabled:
+        app.before_request(start_request_timer)
+        app.after_request(record_request_metrics)
+        app.add_url_rule("/metrics", "metrics", metrics_view, methods=["GET"])
+
+    if replicas.replica_set.enabled:
+        app.before_request(route_reads)
+        app.after_request(remember_writes)
+
+    app.before_request(open_unit_of_work)
+    app.after_request(commit_unit_of_work)
+    app.teardown_request(close_unit_of_work)
+
+    app.before_serving(startup)
+    app.after_serving(shutdown)
+    return app
+
+
+# Точка входа для ASGI-серверов: hypercorn backend.app:app
+app = create_app()
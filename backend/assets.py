@@ -0,0 +1,269 @@
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import posixpath
+import re
+from datetime import datetime, timezone
+from typing import Optional
+
+from quart import Blueprint, Response, abort, request, url_for
+
+from . import http_cache
+from .compression import optional_brotli
+from .file_body import PreadFileBody
+
+logger = logging.getLogger(__name__)
+
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "frontend")
+SOURCE_DIR = os.path.join(FRONTEND_DIR, "static")
+DIST_DIR = os.path.join(FRONTEND_DIR, "dist")
+MANIFEST_NAME = "manifest.json"
+
+HASH_LENGTH = 10
+# woff/woff2 и изображения уже сжаты, повторное сжатие только тратит CPU клиента
+COMPRESSIBLE = (".css", ".js", ".svg", ".ttf", ".json", ".txt")
+# Порядок предпочтения, если клиент принимает оба
+ENCODINGS = ("br", "gzip")
+_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+assets_bp = Blueprint("assets", __name__)
+
+# Исходное имя -> имя с хэшем; заполняется load_manifest
+_manifest = {}
+# Имя с хэшем -> {кодировка или None: (путь, размер)}
+_files = {}
+# Хэш манифеста и время сборки: входят в валидаторы HTML-страниц, ссылающихся на ресурсы
+_built = {"version": "", "at": None}
+
+
+# Строки и комментарии: внутри строк пробелы и знаки препинания не трогаем
+_CSS_TOKEN_RE = re.compile(r"""("(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*')|(/\*.*?\*/)""", re.S)
+_CSS_SPACE_RE = re.compile(r"\s+")
+_CSS_PUNCT_RE = re.compile(r" ?([{};,>]) ?")
+_CSS_URL_RE = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+
+def minify_css(text: str) -> str:
+    """
+    Консервативная минификация CSS: убирает комментарии (кроме /*! лицензий */)
+    и лишние пробелы, не меняя сами правила
+    """
+    parts = []
+    code = []
+    position = 0
+    for match in _CSS_TOKEN_RE.finditer(text):
+        code.append(text[position:match.start()])
+        position = match.end()
+        string, comment = match.groups()
+        if comment is not None and not comment.startswith("/*!"):
+            continue
+        parts.append(("code", "".join(code)))
+        code = []
+        parts.append(("keep", string or comment + "\n"))
+    code.append(text[position:])
+    parts.append(("code", "".join(code)))
+
+    result = []
+    for kind, value in parts:
+        if kind == "code":
+            value = _CSS_SPACE_RE.sub(" ", value)
+            value = _CSS_PUNCT_RE.sub(r"\1", value)
+            value = value.replace(": ", ":").replace(";}", "}")
+        result.append(value)
+    return "".join(result).strip()
+
+def _rewrite_urls(text: str, name: str, manifest: dict) -> str:
+    """Заменить относительные url() в CSS на имена с хэшем"""
+    base = posixpath.dirname(name)
+
+    def replace(match):
+        quote, reference = match.groups()
+        if reference.startswith(("data:", "http:", "https:", "//", "/", "#")):
+            return match.group(0)
+        path, _, fragment = reference.partition("#")
+        path = path.split("?", 1)[0]
+        target = manifest.get(posixpath.normpath(posixpath.join(base, path)))
+        if target is None:
+            return match.group(0)
+        target = posixpath.relpath(target, base or ".")
+        if fragment:
+            target = f"{target}#{fragment}"
+        return f"url({quote}{target}{quote})"
+
+    return _CSS_URL_RE.sub(replace, text)
+
+def _hashed_name(name: str, data: bytes) -> str:
+    stem, ext = posixpath.splitext(name)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}{ext}"
+
+def _write(path: str, data: bytes) -> int:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as target:
+        target.write(data)
+    return len(data)
+
+def _read_manifest(dist_dir: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(dist_dir, MANIFEST_NAME)) as manifest_file:
+            return json.load(manifest_file)
+    except FileNotFoundError:
+        return None
+
+def _built_files(dist_dir: str) -> dict:
+    """Файлы сборки в dist_dir: имя с хэшем -> {кодировка или None: путь}"""
+    found = {}
+    for root, dirs, files in os.walk(dist_dir):
+        for filename in files:
+            path = os.path.join(root, filename)
+            name = os.path.relpath(path, dist_dir).replace(os.sep, "/")
+            if name == MANIFEST_NAME:
+                continue
+            encoding = next(
+                (encoding for encoding in ENCODINGS if name.endswith(_SUFFIXES[encoding])), None
+            )
+            if encoding is not None:
+                name = name[:-len(_SUFFIXES[encoding])]
+            found.setdefault(name, {})[encoding] = path
+    return found
+
+def build(source_dir: str = SOURCE_DIR, dist_dir: str = DIST_DIR) -> list:
+    """
+    Собрать статику в dist_dir: CSS минифицируется, каждому файлу дается имя
+    с хэшем содержимого, сжимаемые файлы получают варианты .gz и .br.
+    Файлы предыдущей сборки остаются: на них ссылаются закэшированные
+    браузерами страницы. Более старые сборки удаляются.
+    Возвращает [(исходное имя, имя с хэшем, {вариант: размер})].
+    """
+    names = []
+    for root, dirs, files in os.walk(source_dir):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for filename in files:
+            if not filename.startswith("."):
+                path = os.path.join(root, filename)
+                names.append(os.path.relpath(path, source_dir).replace(os.sep, "/"))
+    # CSS последними: их url() ссылаются на уже переименованные шрифты
+    names.sort(key=lambda name: (name.endswith(".css"), name))
+
+    brotli = optional_brotli()
+    if brotli is None:
+        logger.warning("brotli is not installed, .br variants are skipped")
+
+    previous = _read_manifest(dist_dir) or {}
+    manifest = {}
+    built = []
+    for name in names:
+        with open(os.path.join(source_dir, name), "rb") as source:
+            data = source.read()
+        sizes = {"source": len(data)}
+        if name.endswith(".css"):
+            text = _rewrite_urls(data.decode("utf-8"), name, manifest)
+            data = minify_css(text).encode("utf-8")
+
+        hashed = _hashed_name(name, data)
+        path = os.path.join(dist_dir, hashed)
+        sizes["identity"] = _write(path, data)
+        if name.endswith(COMPRESSIBLE):
+            variants = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                variants["br"] = brotli.compress(data, quality=11)
+            for encoding, compressed in variants.items():
+                # Сжатый вариант нужен, только если он меньше исходного
+                if len(compressed) < len(data):
+                    sizes[encoding] = _write(path + _SUFFIXES[encoding], compressed)
+
+        manifest[name] = hashed
+        built.append((name, hashed, sizes))
+
+    keep = set(manifest.values()) | set(previous.values())
+    for name, variants in _built_files(dist_dir).items():
+        if name not in keep:
+            for path in variants.values():
+                os.remove(path)
+
+    os.makedirs(dist_dir, exist_ok=True)
+    with open(os.path.join(dist_dir, MANIFEST_NAME), "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+    return built
+
+def load_manifest(dist_dir: str = DIST_DIR) -> bool:
+    """
+    Прочитать манифест собранной статики. Без сборки asset_url отдает обычные /static/ URL.
+    Отдаются все файлы в dist_dir, в том числе оставшиеся от предыдущей сборки.
+    """
+    manifest = _read_manifest(dist_dir)
+    if manifest is None:
+        logger.info(f"{dist_dir} is not built, serving assets from the static folder")
+        return False
+
+    files = {}
+    for hashed, paths in _built_files(dist_dir).items():
+        if None in paths:
+            files[hashed] = {encoding: (path, os.path.getsize(path)) for encoding, path in paths.items()}
+
+    manifest_path = os.path.join(dist_dir, MANIFEST_NAME)
+    _manifest.clear()
+    _manifest.update(manifest)
+    _files.clear()
+    _files.update(files)
+    _built["version"] = hashlib.sha256(json.dumps(manifest, sort_keys=True).encode()).hexdigest()[:HASH_LENGTH]
+    # Как и даты в базе, время хранится в naive UTC
+    _built["at"] = datetime.fromtimestamp(os.path.getmtime(manifest_path), timezone.utc).replace(tzinfo=None)
+    return True
+
+def manifest_version() -> str:
+    """Хэш загруженного манифеста (пустая строка без сборки) для ETag страниц"""
+    return _built["version"]
+
+def page_last_modified(value: Optional[datetime]) -> Optional[datetime]:
+    """Last-Modified страницы: не раньше загруженной сборки, на которую ссылается ее HTML"""
+    built_at = _built["at"]
+    if value is None or built_at is None:
+        return value
+    return max(value, built_at)
+
+def asset_url(filename: str) -> str:
+    """URL ресурса для шаблонов: имя с хэшем из сборки или обычный /static/"""
+    hashed = _manifest.get(filename)
+    if hashed is None:
+        return url_for("static", filename=filename)
+    return url_for("assets.asset_file", filename=hashed)
+
+@assets_bp.route("/assets/<path:filename>", methods=["GET"])
+async def asset_file(filename: str):
+    """Собранный ресурс: заранее сжатый вариант по Accept-Encoding, кэш навсегда"""
+    variants = _files.get(filename)
+    if variants is None:
+        abort(404)
+
+    encoding = next(
+        (encoding for encoding in ENCODINGS if encoding in variants and request.accept_encodings[encoding]),
+        None,
+    )
+    file_path, file_size = variants[encoding]
+    body = PreadFileBody(file_path, file_size)
+    response = Response(body, mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream")
+    response.content_length = file_size
+    if encoding is not None:
+        response.content_encoding = encoding
+    response.vary.add("Accept-Encoding")
+    response.set_etag(http_cache.make_etag(filename, encoding))
+    # Имя содержит хэш содержимого: новое содержимое получает новый URL
+    http_cache.set_immutable(response)
+
+    await response.make_conditional(request)
+    if response.status_code != 200:
+        return response
+
+    if request.method == "HEAD":
+        response.set_data(b"")
+        response.content_length = file_size
+        return response
+
+    try:
+        await body.open()
+    except FileNotFoundError:
+        abort(404)
+    return response
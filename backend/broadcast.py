@@ -0,0 +1,181 @@
+"""
+Рассылка событий о цитатах подписчикам потоков (SSE и WebSocket) внутри процесса.
+
+Операции записи публикуют событие после фиксации транзакции. Событие
+сериализуется один раз и попадает в очереди подписчиков на все цитаты и на
+цитаты его персоны. Очередь подписчика ограничена stream_queue_size: если
+клиент не успевает читать, старые события отбрасываются, а поток сообщает,
+сколько их пропало. Heartbeat рассылает одна общая задача, поэтому ожидающий
+подписчик - это только объект с пустой очередью и одним таймером срока жизни.
+
+Hypercorn вызывает after_serving (и Hub.stop) только после того, как все
+соединения завершатся или пройдет graceful_timeout, поэтому поток сам
+закрывается через stream_max_age_seconds, а клиент переподключается.
+
+Каждый процесс Hypercorn рассылает только записи, выполненные в нем самом.
+"""
+import asyncio
+import contextlib
+import contextvars
+import json
+import logging
+import random
+from typing import Optional
+
+from . import metrics
+from .config import config
+
+logger = logging.getLogger(__name__)
+
+QUOTE_CREATED = "created"
+QUOTE_UPDATED = "updated"
+QUOTE_DELETED = "deleted"
+
+
+class Message:
+    """Событие, сериализованное один раз для всех подписчиков"""
+
+    __slots__ = ("event", "person_id", "data", "sse", "text")
+
+    def __init__(self, event: str, person_id: int, payload: dict) -> None:
+        self.event = event
+        self.person_id = person_id
+        self.data = json.dumps(payload, ensure_ascii=False)
+        self.sse = f"event: {event}\ndata: {self.data}\n\n".encode()
+        self.text = f'{{"event": "{event}", "data": {self.data}}}'
+
+
+class Subscriber:
+    __slots__ = ("person_id", "dropped", "closed", "_messages", "_waiter")
+
+    def __init__(self, person_id: Optional[int]) -> None:
+        self.person_id = person_id
+        self.dropped = 0
+        self.closed = False
+        # Очередь создается только при появлении событий: ожидающий подписчик ее не держит
+        self._messages = None
+        self._waiter = None
+
+    def push(self, message: Message) -> None:
+        if self._messages is None:
+            self._messages = []
+        elif len(self._messages) >= config.stream_queue_size:
+            # Медленный клиент: отбрасываем самое старое событие
+            del self._messages[0]
+            self.dropped += 1
+            metrics.stream_dropped.inc()
+        self._messages.append(message)
+        self.wake()
+
+    def wake(self) -> None:
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def close(self) -> None:
+        self.closed = True
+        self.wake()
+
+    async def get(self):
+        """
+        Дождаться событий и забрать их все. Пустой список - время heartbeat,
+        None - подписка закрыта (хаб остановлен или истек срок жизни) и поток
+        нужно завершить. События, пришедшие до закрытия, отдаются раньше None.
+        """
+        if not self._messages and not self.closed:
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        messages, self._messages = self._messages, None
+        if messages:
+            return messages
+        return None if self.closed else []
+
+    def take_dropped(self) -> int:
+        dropped, self.dropped = self.dropped, 0
+        return dropped
+
+
+class Hub:
+    def __init__(self) -> None:
+        # person_id (None - все цитаты) -> подписчики
+        self._topics = {}
+        self._count = 0
+        self._heartbeat = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return self._count
+
+    def _ensure_heartbeat(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._heartbeat is None or self._heartbeat.done() or self._heartbeat.get_loop() is not loop:
+            self._heartbeat = loop.create_task(self._run_heartbeat(), context=contextvars.Context())
+
+    async def _run_heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(config.stream_heartbeat_seconds)
+            for subscribers in self._topics.values():
+                for subscriber in subscribers:
+                    subscriber.wake()
+
+    @contextlib.contextmanager
+    def subscribe(self, person_id: Optional[int] = None):
+        """Подписка на события всех цитат или одной персоны на время блока with"""
+        if self._count >= config.stream_max_subscribers:
+            raise OverflowError(f"Subscriber limit of {config.stream_max_subscribers} reached")
+        self._ensure_heartbeat()
+        subscriber = Subscriber(person_id)
+        self._topics.setdefault(person_id, set()).add(subscriber)
+        self._count += 1
+        expire = None
+        if config.stream_max_age_seconds > 0:
+            # Разброс в 10%, чтобы подключившиеся вместе клиенты не переподключались разом
+            expire = asyncio.get_running_loop().call_later(
+                config.stream_max_age_seconds * random.uniform(0.9, 1.0), subscriber.close
+            )
+        try:
+            yield subscriber
+        finally:
+            if expire is not None:
+                expire.cancel()
+            subscribers = self._topics.get(person_id)
+            if subscribers is not None and subscriber in subscribers:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._topics[person_id]
+                self._count -= 1
+
+    def publish(self, message: Message) -> None:
+        for topic in (None, message.person_id):
+            for subscriber in self._topics.get(topic, ()):
+                subscriber.push(message)
+        metrics.stream_messages.inc(event=message.event)
+
+    async def stop(self) -> None:
+        """Завершить все потоки и остановить heartbeat"""
+        for subscribers in self._topics.values():
+            for subscriber in subscribers:
+                subscriber.close()
+        self._topics.clear()
+        self._count = 0
+        if self._heartbeat is not None and self._heartbeat.get_loop() is asyncio.get_running_loop():
+            self._heartbeat.cancel()
+            try:
+                await self._heartbeat
+            except asyncio.CancelledError:
+                pass
+        self._heartbeat = None
+
+
+hub = Hub()
+metrics.Gauge("fanbase_stream_subscribers", "Open quote stream subscriptions", lambda: hub.subscriber_count)
+
+
+def publish_quote(event: str, quote_id: int, person_id: int, quote_text: Optional[str] = None) -> None:
+    """Callback для unit_of_work.after_commit: событие о цитате после фиксации"""
+    payload = {"id": quote_id, "quote": quote_text, "person_id": person_id}
+    if event == QUOTE_DELETED:
+        del payload["quote"]
+    hub.publish(Message(event, person_id, payload))
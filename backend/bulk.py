@@ -0,0 +1,73 @@
+import csv
+import io
+import json
+import os
+
+FORMAT_CSV = "csv"
+FORMAT_JSONL = "jsonl"
+FORMATS = (FORMAT_CSV, FORMAT_JSONL)
+FIELDS = ("full_name", "quote")
+
+MIMETYPES = {
+    FORMAT_CSV: "text/csv",
+    FORMAT_JSONL: "application/x-ndjson",
+}
+
+_EXTENSIONS = {
+    ".csv": FORMAT_CSV,
+    ".jsonl": FORMAT_JSONL,
+    ".ndjson": FORMAT_JSONL,
+}
+
+
+def format_from_filename(filename: str):
+    """Определить формат по расширению файла, None если не распознан"""
+    return _EXTENSIONS.get(os.path.splitext(filename)[1].lower())
+
+def format_from_mimetype(mimetype: str):
+    for fmt, known in MIMETYPES.items():
+        if mimetype == known:
+            return fmt
+    return None
+
+def read_rows(lines, fmt: str):
+    """
+    Читает строки импорта и отдает пары (full_name, quote).
+    quote может быть None - тогда создается только персона.
+    CSV должен иметь заголовок с колонками full_name и quote.
+    """
+    if fmt == FORMAT_CSV:
+        records = csv.DictReader(lines)
+        missing = set(FIELDS) - set(records.fieldnames or ())
+        if missing:
+            raise ValueError(f"CSV header must contain columns: {', '.join(FIELDS)}")
+    elif fmt == FORMAT_JSONL:
+        records = (json.loads(line) for line in lines if line.strip())
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+    for number, record in enumerate(records, start=1):
+        if not isinstance(record, dict):
+            raise ValueError(f"Row {number}: expected an object")
+        full_name = (record.get("full_name") or "").strip()
+        if not full_name:
+            raise ValueError(f"Row {number}: full_name is required")
+        quote = (record.get("quote") or "").strip() or None
+        yield full_name, quote
+
+def dump_header(fmt: str) -> str:
+    """Заголовок выгрузки: строка колонок для CSV, пусто для JSONL"""
+    if fmt == FORMAT_CSV:
+        return _csv_line(FIELDS)
+    return ""
+
+def dump_row(full_name: str, quote, fmt: str) -> str:
+    """Одна строка выгрузки в выбранном формате"""
+    if fmt == FORMAT_CSV:
+        return _csv_line((full_name, quote or ""))
+    return json.dumps({"full_name": full_name, "quote": quote}, ensure_ascii=False) + "\n"
+
+def _csv_line(values) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerow(values)
+    return buffer.getvalue()
@@ -0,0 +1,115 @@
+import argparse
+import asyncio
+import contextlib
+import sys
+import time
+
+from . import assets, bulk
+from .database import database, Bulk_operation, Person_operation, Search_operation
+
+
+async def _recount_quotes(args):
+    await database.init_db()
+    updated = await Person_operation.recount_quote_counts()
+    print(f"Quote counters recomputed for {updated} persons")
+
+
+async def _rebuild_search(args):
+    await database.init_db()
+    await Search_operation.init_search_index()
+    documents = await Search_operation.rebuild_search_index()
+    print(f"Search index rebuilt: {documents} documents")
+
+
+async def _build_assets(args):
+    built = assets.build()
+    for name, hashed, sizes in built:
+        variants = ", ".join(f"{variant} {size}" for variant, size in sizes.items())
+        print(f"{name} -> {hashed} ({variants})")
+    print(f"Built {len(built)} assets into {assets.DIST_DIR}")
+
+
+def _resolve_format(args):
+    fmt = args.format or bulk.format_from_filename(args.path)
+    if fmt is None:
+        raise SystemExit(f"Cannot detect format of {args.path}, pass --format")
+    return fmt
+
+def _open(path: str, mode: str):
+    if path == "-":
+        return contextlib.nullcontext(sys.stdin if "r" in mode else sys.stdout)
+    return open(path, mode, encoding="utf-8", newline="")
+
+def _report_import(stats):
+    print(
+        f"\r{stats.rows} rows, {stats.quotes_created} quotes, "
+        f"{stats.persons_created} new persons, {stats.rows_per_second:.0f} rows/s",
+        end="", file=sys.stderr, flush=True,
+    )
+
+async def _import(args):
+    fmt = _resolve_format(args)
+    await database.init_db()
+    await Search_operation.init_search_index()
+    with _open(args.path, "r") as source:
+        stats = await Bulk_operation.import_rows(
+            bulk.read_rows(source, fmt), batch_size=args.batch_size, progress=_report_import
+        )
+    print(file=sys.stderr)
+    print(f"Imported {stats.rows} rows in {stats.elapsed:.1f}s ({stats.rows_per_second:.0f} rows/s)")
+
+async def _export(args):
+    fmt = _resolve_format(args)
+    await database.init_db()
+    started = time.monotonic()
+    rows = 0
+    with _open(args.path, "w") as target:
+        target.write(bulk.dump_header(fmt))
+        async for full_name, quote in Bulk_operation.stream_export(batch_size=args.batch_size):
+            target.write(bulk.dump_row(full_name, quote, fmt))
+            rows += 1
+            if rows % args.batch_size == 0:
+                print(f"\r{rows} rows", end="", file=sys.stderr, flush=True)
+    elapsed = time.monotonic() - started
+    print(file=sys.stderr)
+    print(f"Exported {rows} rows in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:.0f} rows/s)", file=sys.stderr)
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m backend")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    recount = subparsers.add_parser(
+        "recount-quotes", help="recompute Person.quote_count from the quotes table"
+    )
+    recount.set_defaults(handler=_recount_quotes)
+
+    rebuild = subparsers.add_parser(
+        "rebuild-search", help="rebuild the full-text search index"
+    )
+    rebuild.set_defaults(handler=_rebuild_search)
+
+    build_assets = subparsers.add_parser(
+        "build-assets", help="minify, fingerprint and precompress frontend/static into frontend/dist"
+    )
+    build_assets.set_defaults(handler=_build_assets)
+
+    for name, handler, help_text in (
+        ("import", _import, "bulk import persons and quotes from CSV or JSONL"),
+        ("export", _export, "stream all persons and quotes to CSV or JSONL"),
+    ):
+        command = subparsers.add_parser(name, help=help_text)
+        command.add_argument("path", help="file path, or - for stdin/stdout")
+        command.add_argument("--format", choices=bulk.FORMATS, help="default: by file extension")
+        command.add_argument(
+            "--batch-size", type=int, default=Bulk_operation.DEFAULT_BATCH_SIZE,
+            help="rows per transaction (default: %(default)s)",
+        )
+        command.set_defaults(handler=handler)
+
+    return parser
+
+
+def run(argv) -> int:
+    args = build_parser().parse_args(argv)
+    asyncio.run(args.handler(args))
+    return 0
@@ -0,0 +1,148 @@
+import asyncio
+import mimetypes
+import zlib
+
+from quart import Response, request
+from quart.wrappers.response import DataBody, FileBody, ResponseBody
+
+from .config import config
+from .database.WIKI_operation import ALLOWED_EXTENSIONS
+from .file_body import PreadFileBody
+
+GZIP_LEVEL = 6
+# Для динамических ответов: сжимает лучше gzip 6 примерно за то же время
+BROTLI_QUALITY = 4
+
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+}
+# Изображения уже сжаты, а text/event-stream должен уходить клиенту событие за событием
+EXCLUDED_MIMETYPES = {
+    mimetypes.guess_type(f"file{extension}")[0] for extension in ALLOWED_EXTENSIONS
+} | {"text/event-stream"}
+
+
+def optional_brotli():
+    """Модуль brotli, если установлен, иначе None"""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+_brotli_module = optional_brotli()
+ENCODINGS = ("br", "gzip") if _brotli_module is not None else ("gzip",)
+
+
+class _Encoder:
+    """Общий интерфейс потокового сжатия для gzip и brotli"""
+
+    __slots__ = ("compress", "finish")
+
+    def __init__(self, encoding: str) -> None:
+        if encoding == "br":
+            compressor = _brotli_module.Compressor(quality=BROTLI_QUALITY)
+            self.compress = compressor.process
+            self.finish = compressor.finish
+        else:
+            compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+            self.compress = compressor.compress
+            self.finish = compressor.flush
+
+def compress(data: bytes, encoding: str) -> bytes:
+    encoder = _Encoder(encoding)
+    return encoder.compress(data) + encoder.finish()
+
+async def _run(function, data: bytes, *args):
+    # Крупные блоки сжимаются в потоке, чтобы не держать event loop
+    if len(data) >= config.compression_thread_size:
+        return await asyncio.to_thread(function, data, *args)
+    return function(data, *args)
+
+
+class CompressedBody(ResponseBody):
+    """Сжимает потоковое тело по мере чтения, не собирая его целиком в памяти"""
+
+    def __init__(self, body: ResponseBody, encoding: str) -> None:
+        self.body = body
+        self.encoding = encoding
+        self._iterator = None
+        self._encoder = None
+
+    async def __aenter__(self) -> "CompressedBody":
+        self._iterator = (await self.body.__aenter__()).__aiter__()
+        self._encoder = _Encoder(self.encoding)
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, tb) -> None:
+        await self.body.__aexit__(exc_type, exc_value, tb)
+
+    def __aiter__(self) -> "CompressedBody":
+        return self
+
+    async def __anext__(self) -> bytes:
+        while self._encoder is not None:
+            try:
+                chunk = await self._iterator.__anext__()
+            except StopAsyncIteration:
+                tail = self._encoder.finish()
+                self._encoder = None
+                return tail
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            # Компрессор сам копит мелкие блоки и отдает данные, когда их достаточно
+            compressed = await _run(self._encoder.compress, chunk)
+            if compressed:
+                return compressed
+        raise StopAsyncIteration()
+
+
+def _is_compressible(response: Response) -> bool:
+    mimetype = response.mimetype
+    if mimetype is None or mimetype in EXCLUDED_MIMETYPES:
+        return False
+    if not (mimetype.startswith("text/") or mimetype in COMPRESSIBLE_MIMETYPES):
+        return False
+    # Файлы (статика, изображения) отдаются как есть: статика сжата при сборке
+    if isinstance(response.response, (FileBody, PreadFileBody)):
+        return False
+    return (
+        request.method != "HEAD"
+        and 200 <= response.status_code < 300
+        and response.status_code not in (204, 206)
+        and "Content-Encoding" not in response.headers
+        and not response.cache_control.no_transform
+    )
+
+async def compress_response(response: Response) -> Response:
+    """after_request: сжатие HTML и JSON по Accept-Encoding"""
+    if not _is_compressible(response):
+        return response
+
+    # Ответ зависит от Accept-Encoding, даже если этот клиент получит его без сжатия
+    response.vary.add("Accept-Encoding")
+    encoding = request.accept_encodings.best_match(ENCODINGS)
+    if encoding is None:
+        return response
+
+    if isinstance(response.response, DataBody):
+        data = response.response.data
+        if len(data) < config.compression_min_size:
+            return response
+        response.set_data(await _run(compress, data, encoding))
+    else:
+        response.response = CompressedBody(response.response, encoding)
+        # Длина сжатого потока заранее неизвестна
+        response.headers.pop("Content-Length", None)
+    response.content_encoding = encoding
+
+    # Сжатое представление не совпадает побайтно с исходным, поэтому ETag слабый;
+    # проверки If-None-Match в http_cache сравнивают ETag слабо и продолжают работать
+    etag, weak = response.get_etag()
+    if etag is not None and not weak:
+        response.set_etag(etag, weak=True)
+    return response
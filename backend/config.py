@@ -1,8 +1,10 @@
 import json
 import logging
+import os
 from dataclasses import MISSING, dataclass, fields
 
-_DEFAULT_CONFIG_PATH = "config.json"
+# Путь можно переопределить переменной окружения, например для бенчмарков
+_DEFAULT_CONFIG_PATH = os.environ.get("FANBASE_CONFIG", "config.json")
 logger = logging.getLogger(__name__)
 
 
@@ -19,6 +21,81 @@ class Config:
     database_port: int = 5432
     debug_mode: bool = False
 
+    # "sqlite" или "postgresql"
+    database_engine: str = "sqlite"
+    database_path: str = "fanbase.db"
+    database_pool_size: int = 10
+    database_max_overflow: int = 20
+    database_pool_timeout: int = 30
+    database_pool_recycle: int = 1800
+    database_statement_cache_size: int = 100
+
+    # Реплики только для чтения: список URL SQLAlchemy того же типа, что и основная база,
+    # например "sqlite+aiosqlite:///replica.db". Проверка исправности раз в
+    # database_replica_check_seconds; после записи клиент database_replica_lag_seconds
+    # секунд читает из основной базы
+    database_replicas: tuple = ()
+    database_replica_check_seconds: float = 5
+    database_replica_lag_seconds: float = 2
+
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_cache_size_kb: int = 64 * 1024
+    sqlite_busy_timeout_ms: int = 5000
+
+    cache_max_entries: int = 1024
+    cache_ttl_seconds: int = 300
+    # При workers > 1 записи другого процесса не сбрасывают кэш этого: время жизни
+    # персон, wiki и изображений ограничивается этим значением
+    cache_workers_ttl_seconds: int = 5
+    # Предел памяти под отрисованные HTML-фрагменты страниц
+    fragment_cache_max_bytes: int = 32 * 1024 * 1024
+
+    image_workers: int = 2
+
+    # Групповая фиксация записей (для SQLite): операции записи собираются в пачки
+    # до write_queue_max_batch штук, ожидая до write_queue_window_ms после первой
+    write_queue_enabled: bool = False
+    write_queue_max_batch: int = 64
+    write_queue_window_ms: float = 2
+
+    # Параметры сервера Hypercorn (python -m backend без debug_mode)
+    bind_host: str = "0.0.0.0"
+    workers: int = 1
+    keep_alive_timeout: int = 5
+    backlog: int = 100
+    graceful_timeout: int = 30
+
+    # Сжатие ответов gzip/brotli: ответы меньше compression_min_size байт не сжимаются,
+    # блоки от compression_thread_size байт сжимаются вне event loop
+    compression_enabled: bool = True
+    compression_min_size: int = 1024
+    compression_thread_size: int = 128 * 1024
+
+    # Потоки новых цитат (SSE и WebSocket): очередь подписчика не длиннее stream_queue_size
+    # событий, пустые потоки получают heartbeat раз в stream_heartbeat_seconds. Поток
+    # закрывается через stream_max_age_seconds (0 - без ограничения), чтобы остановка
+    # сервера не ждала graceful_timeout: значение должно быть меньше него
+    stream_queue_size: int = 100
+    stream_heartbeat_seconds: float = 15
+    stream_max_subscribers: int = 10000
+    stream_max_age_seconds: float = 25
+
+    # Метрики Prometheus на /metrics
+    metrics_enabled: bool = True
+
+    # Логирование: DEBUG/INFO/WARNING/ERROR, формат "text" или "json",
+    # ротация "size", "time" или "none"; {slot} в log_file заменяется на номер слота
+    # процесса (наименьший, не занятый другим живым процессом), {pid} - на id процесса
+    log_level: str = "INFO"
+    log_file: str = "fanbase-{slot}.log"
+    log_format: str = "text"
+    log_rotation: str = "size"
+    log_max_bytes: int = 10 * 1024 * 1024
+    log_rotate_when: str = "midnight"
+    log_backup_count: int = 5
+    # Доля записываемых частых сообщений уровня запроса (extra={"sample": True})
+    log_sample_rate: float = 0.01
+
     def __init__(self, config_file_path="config.json") -> None:
         try:
             with open(config_file_path, "r") as config_file:
@@ -26,12 +103,10 @@ class Config:
         except FileNotFoundError:
             logger.critical(f"{config_file_path} does not exist!")
             raise
-        logging.debug(config_content)
         for field in fields(self):
             val = config_content.get(field.name, field.default)
             if val is MISSING:
                 raise ValueError(f"No value for {field.name}")
-            logging.debug(f"{field.name}: {val}")
             setattr(self, field.name, val)
 
 
@@ -0,0 +1,149 @@
+import logging
+import time
+from collections import Counter
+from datetime import datetime
+from itertools import islice
+
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .database import Person, Quotes, async_session, engine
+from . import Search_operation, cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+class ImportStats:
+    """Счетчики импорта, передаются в progress после каждой пачки"""
+
+    __slots__ = ("rows", "persons_created", "quotes_created", "batches", "started")
+
+    def __init__(self) -> None:
+        self.rows = 0
+        self.persons_created = 0
+        self.quotes_created = 0
+        self.batches = 0
+        self.started = time.monotonic()
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def rows_per_second(self) -> float:
+        elapsed = self.elapsed
+        return self.rows / elapsed if elapsed else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "rows": self.rows,
+            "persons_created": self.persons_created,
+            "quotes_created": self.quotes_created,
+            "batches": self.batches,
+            "elapsed": round(self.elapsed, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+        }
+
+def _person_upsert():
+    """INSERT персоны, пропускающий уже существующие ФИО (уникальный full_name)"""
+    dialect = postgresql if engine.dialect.name == "postgresql" else sqlite
+    return (
+        dialect.insert(Person)
+        .on_conflict_do_nothing(index_elements=[Person.full_name])
+        .returning(Person.id, Person.full_name)
+    )
+
+# Обновление счетчика и версии сразу для многих персон через executemany
+_bump_persons = (
+    update(Person.__table__)
+    .where(Person.__table__.c.id == bindparam("b_id"))
+    .values(
+        quote_count=Person.__table__.c.quote_count + bindparam("b_added"),
+        version=Person.__table__.c.version + 1,
+        updated_at=bindparam("b_updated_at"),
+    )
+)
+
+async def _import_batch(batch, stats: ImportStats):
+    now = datetime.utcnow()
+    names = list(dict.fromkeys(full_name for full_name, _ in batch))
+
+    async with async_session() as session:
+        try:
+            created = (await session.execute(
+                _person_upsert(),
+                [{"full_name": full_name, "updated_at": now} for full_name in names],
+            )).all()
+            await Search_operation.index_documents(
+                session, Search_operation.KIND_PERSON,
+                [(row.id, row.id, row.full_name) for row in created],
+            )
+
+            result = await session.execute(
+                select(Person.id, Person.full_name).where(Person.full_name.in_(names))
+            )
+            person_ids = {row.full_name: row.id for row in result}
+
+            quotes = [
+                {"quote": quote, "person_id": person_ids[full_name]}
+                for full_name, quote in batch if quote
+            ]
+            inserted = []
+            if quotes:
+                inserted = (await session.execute(
+                    insert(Quotes).returning(Quotes.id, Quotes.person_id, Quotes.quote),
+                    quotes,
+                )).all()
+                await Search_operation.index_documents(
+                    session, Search_operation.KIND_QUOTE,
+                    [(row.id, row.person_id, row.quote) for row in inserted],
+                )
+                added = Counter(row.person_id for row in inserted)
+                await session.execute(_bump_persons, [
+                    {"b_id": person_id, "b_added": count, "b_updated_at": now}
+                    for person_id, count in added.items()
+                ])
+
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Error during bulk import batch: {e}")
+            raise
+
+    for full_name, person_id in person_ids.items():
+        cache.forget_person(person_id=person_id, full_name=full_name)
+
+    stats.rows += len(batch)
+    stats.persons_created += len(created)
+    stats.quotes_created += len(inserted)
+    stats.batches += 1
+
+async def import_rows(rows, batch_size: int = DEFAULT_BATCH_SIZE, progress=None) -> ImportStats:
+    """
+    Импорт пар (full_name, quote) пачками по batch_size строк.
+    Каждая пачка - одна транзакция: upsert персон, executemany цитат,
+    документы поиска и quote_count/version персон.
+    progress(stats) вызывается после каждой пачки.
+    """
+    stats = ImportStats()
+    rows = iter(rows)
+    while batch := list(islice(rows, batch_size)):
+        await _import_batch(batch, stats)
+        if progress is not None:
+            progress(stats)
+    return stats
+
+async def stream_export(batch_size: int = DEFAULT_BATCH_SIZE):
+    """Отдает пары (full_name, quote) через серверный курсор; персоны без цитат - с quote None"""
+    async with async_session() as session:
+        query = (
+            select(Person.full_name, Quotes.quote)
+            .outerjoin(Quotes, Quotes.person_id == Person.id)
+            .order_by(Person.id, Quotes.id)
+            .execution_options(yield_per=batch_size)
+        )
+        result = await session.stream(query)
+        async for row in result:
+            yield row.full_name, row.quote
@@ -1,19 +1,42 @@
 import logging
+from datetime import datetime
 
-from sqlalchemy import select
+from sqlalchemy import delete, exists, select, func, update
 
-from .database import Person, async_session
+from .database import Person, Quotes, Wiki, quote_count_repair_statement
+from . import Search_operation, cache, unit_of_work, write_queue
 
 logger = logging.getLogger(__name__)
 
-async def create_person(fullname: str):
-    async with async_session() as session:
+
+class PersonView:
+    """
+    Снимок персоны без привязки к сессии: его можно держать в кэше процесса.
+    Строка Person после отката транзакции истекает и без сессии не читается.
+    """
+
+    __slots__ = ("id", "full_name", "quote_count", "version", "updated_at")
+
+    def __init__(self, person: Person) -> None:
+        self.id = person.id
+        self.full_name = person.full_name
+        self.quote_count = person.quote_count
+        self.version = person.version
+        self.updated_at = person.updated_at
+
+
+@write_queue.queued
+async def create_person(fullname: str, session=None):
+    async with unit_of_work.session_scope(session) as session:
         person = Person(
             full_name= fullname
         )
         session.add(person)
         try:
-            await session.commit()
+            await session.flush()
+            await Search_operation.index_person(session, person)
+            unit_of_work.after_commit(session, cache.forget_person, full_name=fullname)
+            await unit_of_work.commit(session)
             await session.refresh(person)
             return person
         except Exception as e:
@@ -21,72 +44,193 @@ async def create_person(fullname: str):
             logger.error(f"Error during person creation: {e}")
             raise
 
-async def update_person(person_id: int, fullname: str):
-    async with async_session() as session:
-        query = select(Person).where(Person.id == person_id)
-        result = await session.execute(query)
-        person = result.scalar_one_or_none()  
-        
-        if person is None:
-            logger.error(f"Person with id {person_id} does not exist")
-            raise ValueError(f"Person with id {person_id} does not exist")
-        
-        person.full_name = fullname
-        
+@write_queue.queued
+async def update_person(person_id: int, fullname: str, session=None):
+    async with unit_of_work.session_scope(session) as session:
+        query = (
+            update(Person)
+            .where(Person.id == person_id)
+            .values(full_name=fullname, version=Person.version + 1, updated_at=datetime.utcnow())
+            .returning(Person)
+        )
         try:
-            await session.commit()
-            await session.refresh(person)
+            person = (await session.execute(query)).scalar_one_or_none()
+            if person is None:
+                logger.error(f"Person with id {person_id} does not exist")
+                raise ValueError(f"Person with id {person_id} does not exist")
+
+            await Search_operation.index_person(session, person)
+            unit_of_work.after_commit(session, cache.forget_person, person_id=person_id, full_name=fullname)
+            await unit_of_work.commit(session)
             return person
+        except ValueError:
+            raise
         except Exception as e:
             await session.rollback()
             logger.error(f"Error during person update: {e}")
             raise
 
-async def delete_person(person_id: int):
-    async with async_session() as session:
-        query = select(Person).where(Person.id == person_id)
-        result = await session.execute(query)
-        person = result.scalar_one_or_none()
-        
-        if person is None:
-            logger.error(f"Person with id {person_id} does not exist")
-            raise ValueError(f"Person with id {person_id} does not exist")
-        
+@write_queue.queued
+async def delete_person(person_id: int, session=None):
+    async with unit_of_work.session_scope(session) as session:
+        # Персону с цитатами или wiki удалить нельзя, как и раньше через ORM
+        query = (
+            delete(Person)
+            .where(
+                Person.id == person_id,
+                ~exists().where(Quotes.person_id == person_id),
+                ~exists().where(Wiki.person_id == person_id),
+            )
+            .returning(Person.id)
+        )
         try:
-            await session.delete(person)
-            await session.commit()
+            if (await session.execute(query)).scalar_one_or_none() is None:
+                # Медленный путь только при ошибке: выясняем причину
+                if await session.get(Person, person_id) is None:
+                    logger.error(f"Person with id {person_id} does not exist")
+                    raise ValueError(f"Person with id {person_id} does not exist")
+                raise RuntimeError(f"Person with id {person_id} still has quotes or wiki")
+
+            await Search_operation.remove_person(session, person_id)
+            unit_of_work.after_commit(session, cache.forget_person, person_id=person_id)
+            await unit_of_work.commit(session)
             return True
+        except ValueError:
+            raise
         except Exception as e:
             await session.rollback()
             logger.error(f"Error during person deletion: {e}")
             raise
 
-async def get_person_by_name(full_name: str):
-    async with async_session() as session:
+async def get_person_by_name(full_name: str, session=None):
+    # Пока в запросе есть незафиксированные записи, кэш не используется
+    use_cache = not unit_of_work.has_pending_writes(session)
+    if use_cache:
+        person = cache.person_by_name.get(full_name)
+        if person is not None:
+            return person
+
+    async with unit_of_work.session_scope(session) as session:
         query = select(Person).where(Person.full_name == full_name)
         try:
             result = await session.execute(query)
-            return result.scalars().first()
+            person = result.scalars().first()
+            if person is None:
+                return None
+            person = PersonView(person)
+            if use_cache:
+                cache.remember_person(person)
+            return person
         except Exception as e:
             logger.error(f"Error getting person by name={full_name}: {e}")
             return None
 
-async def get_person_by_id(user_id: int):
-    async with async_session() as session:
+async def get_person_by_id(user_id: int, session=None):
+    use_cache = not unit_of_work.has_pending_writes(session)
+    if use_cache:
+        person = cache.person_by_id.get(user_id)
+        if person is not None:
+            return person
+
+    async with unit_of_work.session_scope(session) as session:
         query = select(Person).where(Person.id == user_id)
         try:
             result = await session.execute(query)
-            return result.scalars().first()
+            person = result.scalars().first()
+            if person is None:
+                return None
+            person = PersonView(person)
+            if use_cache:
+                cache.remember_person(person)
+            return person
         except Exception as e:
             logger.error(f"Error getting person by name={user_id}: {e}")
             return None
 
-async def get_all_person():
-    async with async_session() as session:
+async def get_persons_by_ids(person_ids, session=None) -> dict:
+    """Персоны по списку id: найденные в кэше плюс один запрос IN для остальных.
+    Возвращает {id: PersonView}, отсутствующих id в словаре нет"""
+    use_cache = not unit_of_work.has_pending_writes(session)
+    persons = {}
+    missing = []
+    for person_id in person_ids:
+        person = cache.person_by_id.get(person_id) if use_cache else None
+        if person is not None:
+            persons[person_id] = person
+        else:
+            missing.append(person_id)
+    if not missing:
+        return persons
+
+    async with unit_of_work.session_scope(session) as session:
+        query = select(Person).where(Person.id.in_(missing))
+        try:
+            result = await session.execute(query)
+            for person in result.scalars():
+                person = PersonView(person)
+                persons[person.id] = person
+                if use_cache:
+                    cache.remember_person(person)
+            return persons
+        except Exception as e:
+            logger.error(f"Error getting persons by ids={missing}: {e}")
+            raise
+
+async def get_all_person(session=None):
+    async with unit_of_work.session_scope(session) as session:
         query = select(Person)
         try:
             result = await session.execute(query)
             return result.scalars().all()
         except Exception as e:
             logger.error(f"Error getting all person: {e}")
-            return None
\ No newline at end of file
+            return None
+
+async def get_all_person_with_quote_count(aggregate: bool = False, session=None):
+    """Список персон с количеством цитат за один запрос.
+
+    По умолчанию читается счетчик Person.quote_count, при aggregate=True
+    количество считается через LEFT JOIN + GROUP BY по таблице цитат.
+    """
+    if aggregate:
+        query = (
+            select(Person.id, Person.full_name, func.count(Quotes.id).label("quote_count"))
+            .outerjoin(Quotes, Quotes.person_id == Person.id)
+            .group_by(Person.id, Person.full_name)
+        )
+    else:
+        query = select(Person.id, Person.full_name, Person.quote_count)
+    query = query.order_by(Person.id)
+
+    async with unit_of_work.session_scope(session) as session:
+        try:
+            result = await session.execute(query)
+            return result.all()
+        except Exception as e:
+            logger.error(f"Error getting all person with quote count: {e}")
+            return None
+
+async def get_listing_version(session=None):
+    """Агрегат по таблице person, меняющийся при любом изменении списка персон"""
+    async with unit_of_work.session_scope(session) as session:
+        query = select(
+            func.count(Person.id),
+            func.max(Person.id),
+            func.sum(Person.version),
+            func.max(Person.updated_at),
+        )
+        result = await session.execute(query)
+        return tuple(result.one())
+
+async def recount_quote_counts(session=None):
+    """Пересчитать Person.quote_count по таблице цитат"""
+    async with unit_of_work.session_scope(session) as session:
+        try:
+            result = await session.execute(quote_count_repair_statement())
+            unit_of_work.after_commit(session, cache.clear)
+            await unit_of_work.commit(session)
+            return result.rowcount
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Error during quote count recount: {e}")
+            raise
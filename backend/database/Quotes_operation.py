@@ -1,20 +1,33 @@
 import logging
+from typing import Optional
 
-from sqlalchemy import select, func
+from sqlalchemy import delete, select, func, update
 
-from .database import Quotes, async_session
+from backend import broadcast
+from .database import Person, Quotes, async_session, bump_person_version
+from . import Search_operation, cache, unit_of_work, write_queue
 
 logger = logging.getLogger(__name__)
 
-async def create_quote(quote_text: str, person_id: int):
-    async with async_session() as session:
+@write_queue.queued
+async def create_quote(quote_text: str, person_id: int, session=None):
+    async with unit_of_work.session_scope(session) as session:
         quote = Quotes(
             quote=quote_text,
             person_id=person_id
         )
         session.add(quote)
         try:
-            await session.commit()
+            await session.execute(
+                bump_person_version(person_id, quote_count=Person.quote_count + 1)
+            )
+            await Search_operation.index_quote(session, quote)
+            # У персоны изменились quote_count и версия
+            unit_of_work.after_commit(session, cache.forget_person, person_id=person_id)
+            unit_of_work.after_commit(
+                session, broadcast.publish_quote, broadcast.QUOTE_CREATED, quote.id, person_id, quote_text
+            )
+            await unit_of_work.commit(session)
             await session.refresh(quote)
             return quote
         except Exception as e:
@@ -22,54 +35,71 @@ async def create_quote(quote_text: str, person_id: int):
             logger.error(f"Error during quote creation: {e}")
             raise
 
-async def delete_quote(quote_id: int):
-    async with async_session() as session:
-        query = select(Quotes).where(Quotes.id == quote_id)
-        result = await session.execute(query)
-        quote = result.scalar_one_or_none()
-        
-        if quote is None:
-            logger.error(f"Quote with id {quote_id} does not exist")
-            raise ValueError(f"Quote with id {quote_id} does not exist")
-        
+@write_queue.queued
+async def delete_quote(quote_id: int, session=None):
+    async with unit_of_work.session_scope(session) as session:
+        query = delete(Quotes).where(Quotes.id == quote_id).returning(Quotes.person_id)
         try:
-            await session.delete(quote)
-            await session.commit()
+            person_id = (await session.execute(query)).scalar_one_or_none()
+            if person_id is None:
+                logger.error(f"Quote with id {quote_id} does not exist")
+                raise ValueError(f"Quote with id {quote_id} does not exist")
+
+            await session.execute(
+                bump_person_version(person_id, quote_count=Person.quote_count - 1)
+            )
+            await Search_operation.remove_quote(session, quote_id)
+            unit_of_work.after_commit(session, cache.forget_person, person_id=person_id)
+            unit_of_work.after_commit(
+                session, broadcast.publish_quote, broadcast.QUOTE_DELETED, quote_id, person_id
+            )
+            await unit_of_work.commit(session)
             return True
+        except ValueError:
+            raise
         except Exception as e:
             await session.rollback()
             logger.error(f"Error during quote deletion: {e}")
             raise
 
-async def update_quote(quote_id: int, quote_text: str):
-    async with async_session() as session:
-        query = select(Quotes).where(Quotes.id == quote_id)
-        result = await session.execute(query)
-        quote = result.scalar_one_or_none()
-
-        if quote is None:
-            logger.error(f"Quote with id {quote_id} does not exist")
-            raise ValueError(f"Quote with id {quote_id} does not exist")
-        
-        quote.quote = quote_text
-
+@write_queue.queued
+async def update_quote(quote_id: int, quote_text: str, session=None):
+    async with unit_of_work.session_scope(session) as session:
+        query = (
+            update(Quotes)
+            .where(Quotes.id == quote_id)
+            .values(quote=quote_text)
+            .returning(Quotes)
+        )
         try:
-            await session.commit()
-            await session.refresh(quote)
+            quote = (await session.execute(query)).scalar_one_or_none()
+            if quote is None:
+                logger.error(f"Quote with id {quote_id} does not exist")
+                raise ValueError(f"Quote with id {quote_id} does not exist")
+
+            await session.execute(bump_person_version(quote.person_id))
+            await Search_operation.index_quote(session, quote)
+            unit_of_work.after_commit(session, cache.forget_person, person_id=quote.person_id)
+            unit_of_work.after_commit(
+                session, broadcast.publish_quote, broadcast.QUOTE_UPDATED, quote.id, quote.person_id, quote.quote
+            )
+            await unit_of_work.commit(session)
             return quote
+        except ValueError:
+            raise
         except Exception as e:
             await session.rollback()
             logger.error(f"Error during quote editing: {e}")
             raise
 
-async def get_quote_count_by_person(person_id: int):
-    async with async_session() as session:
+async def get_quote_count_by_person(person_id: int, session=None):
+    async with unit_of_work.session_scope(session) as session:
         query = select(func.count(Quotes.id)).where(Quotes.person_id == person_id)
         result = await session.execute(query)
         return result.scalar()
 
-async def get_all_quote_by_person(person_id: int):
-    async with async_session() as session:
+async def get_all_quote_by_person(person_id: int, session=None):
+    async with unit_of_work.session_scope(session) as session:
         query = select(Quotes).where(Quotes.person_id == person_id)
         try:
             result = await session.execute(query)
@@ -78,12 +108,65 @@ async def get_all_quote_by_person(person_id: int):
             logger.error(f"Error getting all person: {e}")
             return None
         
-async def get_all_quote():
-    async with async_session() as session:
+async def get_quotes_by_persons(person_ids, session=None) -> dict:
+    """Цитаты нескольких персон одним запросом IN, сгруппированные по персоне:
+    {person_id: [Quotes]}; персон без цитат в словаре нет"""
+    async with unit_of_work.session_scope(session) as session:
+        query = (
+            select(Quotes)
+            .where(Quotes.person_id.in_(person_ids))
+            .order_by(Quotes.person_id, Quotes.id)
+        )
+        try:
+            result = await session.execute(query)
+        except Exception as e:
+            logger.error(f"Error getting quotes for persons {list(person_ids)}: {e}")
+            raise
+
+        quotes_by_person = {}
+        for quote in result.scalars():
+            quotes_by_person.setdefault(quote.person_id, []).append(quote)
+        return quotes_by_person
+
+async def get_all_quote(session=None):
+    async with unit_of_work.session_scope(session) as session:
         query = select(Quotes)
         try:
             result = await session.execute(query)
             return result.scalars().all()
         except Exception as e:
             logger.error(f"Error getting all quotes: {e}")
-            return None
\ No newline at end of file
+            return None
+
+async def get_quotes_page(after_id: int = 0, limit: int = 100, session=None):
+    """Страница цитат по курсору: id > after_id в порядке возрастания id"""
+    async with unit_of_work.session_scope(session) as session:
+        query = (
+            select(Quotes.id, Quotes.quote, Quotes.person_id)
+            .where(Quotes.id > after_id)
+            .order_by(Quotes.id)
+            .limit(limit)
+        )
+        try:
+            result = await session.execute(query)
+            return result.all()
+        except Exception as e:
+            logger.error(f"Error getting quotes page after id={after_id}: {e}")
+            return None
+
+async def stream_all_quote(after_id: int = 0, limit: Optional[int] = None, batch_size: int = 500):
+    """Отдает цитаты по одной через серверный курсор, не загружая таблицу в память.
+    Всегда открывает свою сессию: тело ответа читается уже после конца запроса"""
+    async with async_session() as session:
+        query = (
+            select(Quotes.id, Quotes.quote, Quotes.person_id)
+            .where(Quotes.id > after_id)
+            .order_by(Quotes.id)
+            .execution_options(yield_per=batch_size)
+        )
+        if limit is not None:
+            query = query.limit(limit)
+
+        result = await session.stream(query)
+        async for row in result:
+            yield row
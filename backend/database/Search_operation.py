@@ -0,0 +1,236 @@
+import logging
+import re
+from typing import Optional
+
+from sqlalchemy import exc, inspect, text
+
+from .database import engine, async_session
+
+logger = logging.getLogger(__name__)
+
+SEARCH_TABLE = "search_index"
+
+KIND_PERSON = "person"
+KIND_QUOTE = "quote"
+KIND_WIKI = "wiki"
+KINDS = (KIND_PERSON, KIND_QUOTE, KIND_WIKI)
+
+# Ключ документа кодирует тип и id исходной строки: ref_id * 4 + код типа.
+# Для FTS5 это rowid, поэтому обновление и удаление идут по первичному ключу.
+_KIND_CODES = {KIND_PERSON: 1, KIND_QUOTE: 2, KIND_WIKI: 3}
+
+# Конфигурация to_tsvector для Postgres: без стемминга, подходит и для ФИО
+POSTGRES_TS_CONFIG = "simple"
+
+_SQLITE_DDL = [
+    f"""CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5(
+        kind UNINDEXED,
+        ref_id UNINDEXED,
+        person_id UNINDEXED,
+        body,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )""",
+]
+
+_POSTGRES_DDL = [
+    f"""CREATE TABLE {SEARCH_TABLE} (
+        doc_id BIGINT PRIMARY KEY,
+        kind VARCHAR(16) NOT NULL,
+        ref_id INTEGER NOT NULL,
+        person_id INTEGER NOT NULL,
+        body TEXT NOT NULL,
+        document TSVECTOR GENERATED ALWAYS AS (to_tsvector('{POSTGRES_TS_CONFIG}', body)) STORED
+    )""",
+    f"CREATE INDEX ix_{SEARCH_TABLE}_document ON {SEARCH_TABLE} USING GIN (document)",
+]
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _is_postgres() -> bool:
+    return engine.dialect.name == "postgresql"
+
+def _key_column() -> str:
+    return "doc_id" if _is_postgres() else "rowid"
+
+def _doc_id(kind: str, ref_id: int) -> int:
+    return ref_id * 4 + _KIND_CODES[kind]
+
+def _build_match(query: str) -> Optional[str]:
+    """Превращает пользовательский ввод в безопасный запрос с префиксным поиском"""
+    words = _WORD_RE.findall(query.lower())
+    if not words:
+        return None
+    if _is_postgres():
+        return " & ".join(f"{word}:*" for word in words)
+    return " ".join(f'"{word}"*' for word in words)
+
+async def init_search_index() -> bool:
+    """Создать поисковый индекс, если его нет. Возвращает True, если индекс был создан"""
+    try:
+        async with engine.begin() as conn:
+            exists = await conn.run_sync(lambda sync_conn: inspect(sync_conn).has_table(SEARCH_TABLE))
+            if exists:
+                return False
+            for ddl in (_POSTGRES_DDL if _is_postgres() else _SQLITE_DDL):
+                await conn.execute(text(ddl))
+    except exc.DBAPIError as e:
+        # Индекс одновременно создал другой процесс: он же его и заполняет
+        if "already exists" not in str(e.orig):
+            raise
+        logger.info(f"Search index {SEARCH_TABLE} was created concurrently")
+        return False
+
+    await rebuild_search_index()
+    return True
+
+async def _put_document(session, kind: str, ref_id: int, person_id: int, body: str):
+    key = _key_column()
+    params = {
+        "doc_id": _doc_id(kind, ref_id),
+        "kind": kind,
+        "ref_id": ref_id,
+        "person_id": person_id,
+        "body": body or "",
+    }
+    await session.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE {key} = :doc_id"), params)
+    await session.execute(
+        text(
+            f"INSERT INTO {SEARCH_TABLE} ({key}, kind, ref_id, person_id, body) "
+            f"VALUES (:doc_id, :kind, :ref_id, :person_id, :body)"
+        ),
+        params,
+    )
+
+async def _remove_document(session, kind: str, ref_id: int):
+    await session.execute(
+        text(f"DELETE FROM {SEARCH_TABLE} WHERE {_key_column()} = :doc_id"),
+        {"doc_id": _doc_id(kind, ref_id)},
+    )
+
+async def index_documents(session, kind: str, documents):
+    """Добавить пачку новых документов одним executemany.
+    documents - последовательность (ref_id, person_id, body)"""
+    params = [
+        {
+            "doc_id": _doc_id(kind, ref_id),
+            "kind": kind,
+            "ref_id": ref_id,
+            "person_id": person_id,
+            "body": body or "",
+        } for ref_id, person_id, body in documents
+    ]
+    if not params:
+        return
+    await session.execute(
+        text(
+            f"INSERT INTO {SEARCH_TABLE} ({_key_column()}, kind, ref_id, person_id, body) "
+            f"VALUES (:doc_id, :kind, :ref_id, :person_id, :body)"
+        ),
+        params,
+    )
+
+async def index_person(session, person):
+    await _put_document(session, KIND_PERSON, person.id, person.id, person.full_name)
+
+async def index_quote(session, quote):
+    await _put_document(session, KIND_QUOTE, quote.id, quote.person_id, quote.quote)
+
+async def index_wiki(session, wiki):
+    await _put_document(session, KIND_WIKI, wiki.id, wiki.person_id, wiki.description)
+
+async def remove_person(session, person_id: int):
+    await _remove_document(session, KIND_PERSON, person_id)
+
+async def remove_quote(session, quote_id: int):
+    await _remove_document(session, KIND_QUOTE, quote_id)
+
+async def rebuild_search_index() -> int:
+    """Полностью перестроить поисковый индекс по таблицам person, quotes и wiki"""
+    key = _key_column()
+    sources = [
+        (KIND_PERSON, "person", "id", "full_name"),
+        (KIND_QUOTE, "quotes", "person_id", "quote"),
+        (KIND_WIKI, "wiki", "person_id", "description"),
+    ]
+    async with async_session() as session:
+        try:
+            await session.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+            for kind, table, person_column, body_column in sources:
+                await session.execute(
+                    text(
+                        f"INSERT INTO {SEARCH_TABLE} ({key}, kind, ref_id, person_id, body) "
+                        f"SELECT id * 4 + {_KIND_CODES[kind]}, '{kind}', id, {person_column}, {body_column} "
+                        f"FROM {table}"
+                    )
+                )
+            if not _is_postgres():
+                await session.execute(
+                    text(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+                )
+            result = await session.execute(text(f"SELECT count(*) FROM {SEARCH_TABLE}"))
+            await session.commit()
+            return result.scalar()
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Error during search index rebuild: {e}")
+            raise
+
+async def search(query: str, kind: Optional[str] = None, page: int = 1, per_page: int = 20):
+    """Ранжированный поиск по цитатам, ФИО и описаниям wiki с постраничной выдачей"""
+    match = _build_match(query)
+    if match is None:
+        return {"total": 0, "results": []}
+
+    params = {"match": match, "limit": per_page, "offset": (page - 1) * per_page}
+    kind_filter = ""
+    if kind:
+        kind_filter = f"AND {SEARCH_TABLE}.kind = :kind"
+        params["kind"] = kind
+
+    if _is_postgres():
+        condition = f"{SEARCH_TABLE}.document @@ to_tsquery('{POSTGRES_TS_CONFIG}', :match)"
+        rank = f"ts_rank({SEARCH_TABLE}.document, to_tsquery('{POSTGRES_TS_CONFIG}', :match))"
+        snippet = (
+            f"ts_headline('{POSTGRES_TS_CONFIG}', {SEARCH_TABLE}.body, to_tsquery('{POSTGRES_TS_CONFIG}', :match), "
+            f"'StartSel=\"\",StopSel=\"\",MaxWords=24,MinWords=8')"
+        )
+    else:
+        # FTS5 не принимает псевдоним таблицы в MATCH, поэтому имя пишется полностью
+        condition = f"{SEARCH_TABLE} MATCH :match"
+        # bm25 возвращает отрицательные значения: чем меньше, тем релевантнее
+        rank = f"-bm25({SEARCH_TABLE})"
+        snippet = f"snippet({SEARCH_TABLE}, 3, '', '', '…', 24)"
+
+    rows_query = text(
+        f"SELECT {SEARCH_TABLE}.kind, {SEARCH_TABLE}.ref_id, {SEARCH_TABLE}.person_id, person.full_name, "
+        f"{snippet} AS snippet, {rank} AS score "
+        f"FROM {SEARCH_TABLE} LEFT JOIN person ON person.id = {SEARCH_TABLE}.person_id "
+        f"WHERE {condition} {kind_filter} "
+        f"ORDER BY score DESC LIMIT :limit OFFSET :offset"
+    )
+    count_query = text(
+        f"SELECT count(*) FROM {SEARCH_TABLE} WHERE {condition} {kind_filter}"
+    )
+
+    async with async_session() as session:
+        try:
+            total = (await session.execute(count_query, params)).scalar()
+            rows = (await session.execute(rows_query, params)).all()
+        except Exception as e:
+            logger.error(f"Error during search for {query!r}: {e}")
+            raise
+
+    return {
+        "total": total,
+        "results": [
+            {
+                "kind": row.kind,
+                "id": row.ref_id,
+                "person_id": row.person_id,
+                "full_name": row.full_name,
+                "snippet": row.snippet,
+                "score": row.score,
+            } for row in rows
+        ],
+    }
@@ -1,13 +1,19 @@
+import asyncio
+import hashlib
 import logging
 import os
-import shutil
+import tempfile
 from datetime import datetime
 from pathlib import Path
 from typing import List, Optional
 
-from sqlalchemy import select, func
+from sqlalchemy import delete, select, func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
 
-from .database import Wiki, WikiImage, async_session
+from backend import images, metrics
+from .database import ImageBlob, Wiki, WikiImage, WikiImageVariant, async_session, bump_person_version
+from . import Search_operation, cache, unit_of_work, write_queue
 
 logger = logging.getLogger(__name__)
 
@@ -27,87 +33,146 @@ def is_allowed_file(filename: str) -> bool:
     """Проверяет, является ли файл разрешенным типом"""
     return Path(filename).suffix.lower() in ALLOWED_EXTENSIONS
 
-def is_valid_image_file(file) -> bool:
-    """Проверяет, является ли файл действительно изображением"""
-    import imghdr
+# Магические числа поддерживаемых форматов: (смещение, сигнатура, mime-тип)
+IMAGE_SIGNATURES = [
+    (0, b'\xff\xd8\xff', 'image/jpeg'),
+    (0, b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (0, b'GIF87a', 'image/gif'),
+    (0, b'GIF89a', 'image/gif'),
+    (8, b'WEBP', 'image/webp'),  # RIFF....WEBP
+]
+
+IMAGE_EXTENSIONS = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/gif': '.gif',
+    'image/webp': '.webp',
+}
+
+# Размер блока при потоковой записи загрузки
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+def detect_image_type(header: bytes) -> Optional[str]:
+    """Определяет mime-тип изображения по первым байтам файла"""
+    for offset, signature, mime_type in IMAGE_SIGNATURES:
+        if header[offset:offset + len(signature)] == signature:
+            if mime_type == 'image/webp' and not header.startswith(b'RIFF'):
+                continue
+            return mime_type
+    return None
+
+def check_file_security(content: bytes) -> bool:
+    """Дополнительные проверки безопасности по первым байтам файла"""
+    if not SECURE_UPLOAD:
+        return True
     
-    # Проверяем MIME-тип
-    if not file.content_type or not file.content_type.startswith('image/'):
+    content = content[:1024]  # Проверяем первые 1KB
+    
+    # Блокируем PHP код
+    if b'<?php' in content or b'<?=' in content:
         return False
     
-    # Проверяем содержимое файла
-    try:
-        # Читаем первые 32 байта для определения типа
-        file.seek(0)
-        header = file.read(32)
-        file.seek(0)  # Возвращаемся в начало
-        
-        # Проверяем магические числа для изображений
-        image_type = imghdr.what(None, h=header)
-        if not image_type or image_type not in ['jpeg', 'jpg', 'png', 'gif', 'webp']:
-            return False
-            
-        return True
-    except Exception:
+    # Блокируем JavaScript код
+    if b'<script' in content or b'javascript:' in content:
         return False
-
-def check_file_security(file) -> bool:
-    """Дополнительные проверки безопасности файла"""
-    if not SECURE_UPLOAD:
-        return True
     
-    try:
-        # Проверяем на наличие вредоносных паттернов
-        file.seek(0)
-        content = file.read(1024)  # Читаем первые 1KB
-        file.seek(0)
-        
-        # Блокируем PHP код
-        if b'<?php' in content or b'<?=' in content:
-            return False
-        
-        # Блокируем JavaScript код
-        if b'<script' in content or b'javascript:' in content:
-            return False
-        
-        # Блокируем HTML теги
-        if b'<html' in content or b'<!DOCTYPE' in content:
-            return False
-        
-        # Блокируем исполняемые файлы
-        if BLOCK_EXECUTABLE_EXTENSIONS:
-            dangerous_patterns = [
-                b'MZ',  # Windows PE
-                b'\x7fELF',  # Linux ELF
-                b'#!/',  # Shebang
-            ]
-            for pattern in dangerous_patterns:
-                if content.startswith(pattern):
-                    return False
-        
-        return True
-    except Exception:
+    # Блокируем HTML теги
+    if b'<html' in content or b'<!DOCTYPE' in content:
         return False
-
-def get_safe_filename(filename: str) -> str:
-    """Генерирует безопасное имя файла"""
-    import uuid
-    ext = Path(filename).suffix.lower()
-    safe_name = f"{uuid.uuid4().hex}{ext}"
-    return safe_name
-
-async def create_wiki(description: str, person_id: int, created_by: Optional[str] = None):
-    # Обрезаем лишние пробелы, но сохраняем переносы строк
-    if description:
-        # Обрабатываем каждую строку отдельно, чтобы сохранить переносы
-        lines = description.strip().split('\n')
-        # Убираем лишние пробелы в каждой строке, но сохраняем пустые строки для переносов
-        processed_lines = []
-        for line in lines:
-            processed_lines.append(' '.join(line.split()) if line.strip() else '')
-        description = '\n'.join(processed_lines)
     
-    async with async_session() as session:
+    # Блокируем исполняемые файлы
+    if BLOCK_EXECUTABLE_EXTENSIONS:
+        dangerous_patterns = [
+            b'MZ',  # Windows PE
+            b'\x7fELF',  # Linux ELF
+            b'#!/',  # Shebang
+        ]
+        for pattern in dangerous_patterns:
+            if content.startswith(pattern):
+                return False
+    
+    return True
+
+def _write_upload(file):
+    """Пишет загрузку во временный файл блоками за один проход, проверяя ее по пути
+    и считая SHA-256. Выполняется в потоке. Возвращает (путь, размер, mime-тип, хэш)"""
+    fd, tmp_path = tempfile.mkstemp(dir=UPLOAD_FOLDER, prefix=".upload-")
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            digest = hashlib.sha256()
+            file_size = 0
+            mime_type = None
+            while True:
+                chunk = file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+
+                if mime_type is None:
+                    # Первый блок: магические числа и запрещенные паттерны
+                    mime_type = detect_image_type(chunk)
+                    if mime_type is None:
+                        raise ValueError("File is not a valid image. Content validation failed.")
+                    if not check_file_security(chunk):
+                        raise ValueError("File contains potentially dangerous content. Security check failed.")
+
+                file_size += len(chunk)
+                if file_size > MAX_FILE_SIZE:
+                    raise ValueError(f"File too large. Maximum size: {MAX_FILE_SIZE // (1024*1024)}MB")
+                digest.update(chunk)
+                tmp.write(chunk)
+
+        if mime_type is None:
+            raise ValueError("File is not a valid image. Content validation failed.")
+
+        return tmp_path, file_size, mime_type, digest.hexdigest()
+    except BaseException:
+        _remove_files([tmp_path])
+        raise
+
+def _remove_files(paths):
+    for path in paths:
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except Exception as e:
+            logger.error(f"Error deleting file: {e}")
+
+def blob_path(content_hash: str, mime_type: str) -> str:
+    """Путь к файлу по хэшу содержимого: ab/cd/<hash>.<ext>"""
+    return os.path.join(
+        UPLOAD_FOLDER, content_hash[:2], content_hash[2:4], content_hash + IMAGE_EXTENSIONS[mime_type]
+    )
+
+def _place_blob(tmp_path: str, file_path: str):
+    # Файл появляется под своим именем только после всех проверок
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    os.replace(tmp_path, file_path)
+
+def normalize_description(description: Optional[str]) -> Optional[str]:
+    """Обрезать лишние пробелы в каждой строке, сохраняя переносы и пустые строки"""
+    if not description:
+        return description
+    lines = description.strip().split('\n')
+    return '\n'.join(' '.join(line.split()) if line.strip() else '' for line in lines)
+
+async def _touch_wiki(session, wiki_id: int):
+    """Обновляет updated_at у wiki и версию ее персоны, возвращает id персоны"""
+    result = await session.execute(
+        update(Wiki)
+        .where(Wiki.id == wiki_id)
+        .values(updated_at=datetime.utcnow())
+        .returning(Wiki.person_id)
+    )
+    person_id = result.scalar_one_or_none()
+    if person_id is not None:
+        await session.execute(bump_person_version(person_id))
+    return person_id
+
+@write_queue.queued
+async def create_wiki(description: str, person_id: int, created_by: Optional[str] = None, session=None):
+    description = normalize_description(description)
+
+    async with unit_of_work.session_scope(session) as session:
         wiki = Wiki(
             description=description,
             person_id=person_id,
@@ -115,7 +180,11 @@ async def create_wiki(description: str, person_id: int, created_by: Optional[str
         )
         session.add(wiki)
         try:
-            await session.commit()
+            await session.flush()
+            await session.execute(bump_person_version(person_id))
+            await Search_operation.index_wiki(session, wiki)
+            unit_of_work.after_commit(session, cache.forget_person, person_id=person_id)
+            await unit_of_work.commit(session)
             await session.refresh(wiki)
             return wiki
         except Exception as e:
@@ -123,37 +192,51 @@ async def create_wiki(description: str, person_id: int, created_by: Optional[str
             logger.error(f"Error during wiki creation: {e}")
             raise
 
-async def update_wiki(wiki_id: int, description: str, updated_by: Optional[str] = None):
-    # Обрезаем лишние пробелы, но сохраняем переносы строк
-    if description:
-        # Обрабатываем каждую строку отдельно, чтобы сохранить переносы
-        lines = description.strip().split('\n')
-        # Убираем лишние пробелы в каждой строке, но сохраняем пустые строки для переносов
-        processed_lines = []
-        for line in lines:
-            processed_lines.append(' '.join(line.split()) if line.strip() else '')
-        description = '\n'.join(processed_lines)
-    
-    async with async_session() as session:
-        query = select(Wiki).where(Wiki.id == wiki_id)
-        result = await session.execute(query)
-        wiki_entry = result.scalar_one_or_none()
+@write_queue.queued
+async def update_wiki(wiki_id: int, description: str, updated_by: Optional[str] = None, session=None):
+    description = normalize_description(description)
+
+    async with unit_of_work.session_scope(session) as session:
+        wiki_entry = await _update_wiki_where(session, Wiki.id == wiki_id, description, updated_by)
 
         if wiki_entry is None:
             logger.error(f"Wiki entry with id {wiki_id} does not exist")
             raise ValueError(f"Wiki entry with id {wiki_id} does not exist")
-        
-        wiki_entry.description = description
-        wiki_entry.updated_at = datetime.utcnow()
-        if updated_by:
-            wiki_entry.created_by = updated_by
-            
-        await session.commit()
-        await session.refresh(wiki_entry)
+
+        await unit_of_work.commit(session)
         return wiki_entry
 
-async def get_wiki_by_teacher_id(person_id: int):
-    async with async_session() as session:
+async def _update_wiki_where(session, condition, description: str, updated_by: Optional[str]):
+    """UPDATE ... RETURNING по условию; None, если подходящей wiki нет"""
+    values = {"description": description, "updated_at": datetime.utcnow()}
+    if updated_by:
+        values["created_by"] = updated_by
+
+    query = update(Wiki).where(condition).values(**values).returning(Wiki)
+    wiki_entry = (await session.execute(query)).scalars().first()
+    if wiki_entry is None:
+        return None
+
+    await session.execute(bump_person_version(wiki_entry.person_id))
+    await Search_operation.index_wiki(session, wiki_entry)
+    unit_of_work.after_commit(session, cache.forget_wiki, wiki_entry.id)
+    unit_of_work.after_commit(session, cache.forget_person, person_id=wiki_entry.person_id)
+    return wiki_entry
+
+@write_queue.queued
+async def save_wiki(person_id: int, description: str, updated_by: Optional[str] = None, session=None):
+    """Обновить wiki персоны, а если ее нет - создать. Без предварительного чтения wiki"""
+    description = normalize_description(description)
+
+    async with unit_of_work.session_scope(session) as session:
+        wiki_entry = await _update_wiki_where(session, Wiki.person_id == person_id, description, updated_by)
+        if wiki_entry is None:
+            return await create_wiki(description, person_id, updated_by, session=session)
+        await unit_of_work.commit(session)
+        return wiki_entry
+
+async def get_wiki_by_teacher_id(person_id: int, session=None):
+    async with unit_of_work.session_scope(session) as session:
         query = select(Wiki).where(Wiki.person_id == person_id)
         result = await session.execute(query)
         wiki_entries = result.scalars().all()
@@ -164,9 +247,9 @@ async def get_wiki_by_teacher_id(person_id: int):
         
         return wiki_entries
 
-async def get_wiki_by_id(wiki_id: int):
+async def get_wiki_by_id(wiki_id: int, session=None):
     """Получить wiki по ID"""
-    async with async_session() as session:
+    async with unit_of_work.session_scope(session) as session:
         query = select(Wiki).where(Wiki.id == wiki_id)
         result = await session.execute(query)
         return result.scalar_one_or_none()
@@ -179,114 +262,335 @@ async def upload_wiki_image(wiki_id: int, file, uploaded_by: Optional[str] = Non
     if not is_allowed_file(file.filename):
         raise ValueError(f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}")
     
-    # Проверяем, что файл действительно является изображением
-    if not is_valid_image_file(file):
+    # Проверяем MIME-тип, заявленный клиентом
+    if not file.content_type or not file.content_type.startswith('image/'):
         raise ValueError("File is not a valid image. Content validation failed.")
     
-    # Дополнительные проверки безопасности
-    if not check_file_security(file):
-        raise ValueError("File contains potentially dangerous content. Security check failed.")
-    
-    # Проверяем размер файла
-    file.seek(0, 2)  # Перемещаемся в конец файла
-    file_size = file.tell()
-    file.seek(0)  # Возвращаемся в начало
-    
-    if file_size > MAX_FILE_SIZE:
-        raise ValueError(f"File too large. Maximum size: {MAX_FILE_SIZE // (1024*1024)}MB")
-    
-    # Генерируем безопасное имя файла
-    safe_filename = get_safe_filename(file.filename)
-    file_path = os.path.join(UPLOAD_FOLDER, safe_filename)
-    
-    # Сохраняем файл
+    # Проверяем содержимое и пишем во временный файл за один проход в отдельном потоке
     try:
-        with open(file_path, 'wb') as f:
-            shutil.copyfileobj(file, f)
+        tmp_path, file_size, mime_type, content_hash = await asyncio.to_thread(_write_upload, file)
+    except ValueError:
+        metrics.uploads.inc(result="rejected")
+        raise
     except Exception as e:
         logger.error(f"Error saving file: {e}")
         raise ValueError("Error saving file")
-    
-    # Сохраняем информацию в базу данных
+
+    file_path = blob_path(content_hash, mime_type)
+    wiki_image = WikiImage(
+        wiki_id=wiki_id,
+        filename=os.path.basename(file_path),
+        original_filename=file.filename,
+        file_path=file_path,
+        file_size=file_size,
+        mime_type=mime_type,
+        uploaded_by=uploaded_by,
+        content_hash=content_hash
+    )
+
+    metrics.upload_bytes.inc(file_size)
+    try:
+        # Такой файл уже есть: новая запись ссылается на существующий blob
+        if await _add_image_reference(wiki_image):
+            metrics.uploads.inc(result="deduplicated")
+            return wiki_image
+
+        await asyncio.to_thread(_place_blob, tmp_path, file_path)
+        # Уменьшенные копии и WebP создаются в пуле процессов
+        variants = await images.create_variants(file_path)
+
+        try:
+            await _add_image_blob(wiki_image, variants)
+        except IntegrityError:
+            # Тот же файл параллельно загрузили в другом запросе
+            if await _add_image_reference(wiki_image):
+                metrics.uploads.inc(result="deduplicated")
+                return wiki_image
+            raise
+        metrics.uploads.inc(result="stored")
+        return wiki_image
+    finally:
+        _remove_files([tmp_path])
+
+async def _add_image_reference(wiki_image: WikiImage) -> bool:
+    """Увеличить счетчик ссылок существующего blob и сохранить запись изображения.
+    Возвращает False, если blob с таким хэшем нет.
+    Использует свою транзакцию: откат при гонке загрузок не должен затрагивать запрос"""
     async with async_session() as session:
-        wiki_image = WikiImage(
-            wiki_id=wiki_id,
-            filename=safe_filename,
-            original_filename=file.filename,
-            file_path=file_path,
-            file_size=file_size,
-            mime_type=file.content_type or 'application/octet-stream',
-            uploaded_by=uploaded_by
-        )
-        
+        try:
+            result = await session.execute(
+                update(ImageBlob)
+                .where(ImageBlob.content_hash == wiki_image.content_hash)
+                .values(ref_count=ImageBlob.ref_count + 1)
+                .returning(ImageBlob.file_path)
+            )
+            if result.scalar_one_or_none() is None:
+                await session.rollback()
+                return False
+
+            # Производные файлы общие для всех ссылок на blob
+            source_id = (
+                select(WikiImage.id)
+                .where(WikiImage.content_hash == wiki_image.content_hash)
+                .limit(1)
+                .scalar_subquery()
+            )
+            variants = await session.execute(
+                select(WikiImageVariant).where(WikiImageVariant.image_id == source_id)
+            )
+            wiki_image.variants = [
+                WikiImageVariant(
+                    size=variant.size,
+                    format=variant.format,
+                    file_path=variant.file_path,
+                    file_size=variant.file_size,
+                    mime_type=variant.mime_type,
+                    width=variant.width,
+                    height=variant.height
+                ) for variant in variants.scalars().all()
+            ]
+
+            session.add(wiki_image)
+            person_id = await _touch_wiki(session, wiki_image.wiki_id)
+            await session.commit()
+            await session.refresh(wiki_image)
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Error during image upload: {e}")
+            raise
+
+    cache.forget_wiki(wiki_image.wiki_id)
+    cache.forget_person(person_id=person_id)
+    return True
+
+async def _add_image_blob(wiki_image: WikiImage, variants: list):
+    """Сохранить новый blob, запись изображения и производные файлы"""
+    async with async_session() as session:
+        session.add(ImageBlob(
+            content_hash=wiki_image.content_hash,
+            file_path=wiki_image.file_path,
+            file_size=wiki_image.file_size,
+            mime_type=wiki_image.mime_type,
+            ref_count=1
+        ))
+        wiki_image.variants = [WikiImageVariant(**variant) for variant in variants]
         session.add(wiki_image)
         try:
+            await session.flush()
+            person_id = await _touch_wiki(session, wiki_image.wiki_id)
             await session.commit()
             await session.refresh(wiki_image)
-            return wiki_image
+        except IntegrityError:
+            await session.rollback()
+            raise
         except Exception as e:
             await session.rollback()
-            # Удаляем файл если не удалось сохранить в БД
-            try:
-                os.remove(file_path)
-            except:
-                pass
+            # Удаляем файлы если не удалось сохранить в БД
+            _remove_files([wiki_image.file_path, *(variant["file_path"] for variant in variants)])
             logger.error(f"Error during image upload: {e}")
             raise
 
-async def get_wiki_images(wiki_id: int) -> List[WikiImage]:
+    cache.forget_wiki(wiki_image.wiki_id)
+    cache.forget_person(person_id=person_id)
+
+async def get_wiki_images(wiki_id: int, session=None) -> List[WikiImage]:
     """Получить все изображения для wiki"""
-    async with async_session() as session:
+    async with unit_of_work.session_scope(session) as session:
         query = select(WikiImage).where(WikiImage.wiki_id == wiki_id)
         result = await session.execute(query)
         return result.scalars().all()
 
-async def delete_wiki_image(image_id: int) -> bool:
+async def delete_wiki_image(image_id: int, session=None) -> bool:
     """Удалить изображение wiki"""
-    async with async_session() as session:
-        query = select(WikiImage).where(WikiImage.id == image_id)
+    async with unit_of_work.session_scope(session) as session:
+        query = (
+            select(WikiImage)
+            .where(WikiImage.id == image_id)
+            .options(selectinload(WikiImage.variants))
+        )
         result = await session.execute(query)
         wiki_image = result.scalar_one_or_none()
         
         if not wiki_image:
             return False
         
-        # Удаляем файл
-        try:
-            if os.path.exists(wiki_image.file_path):
-                os.remove(wiki_image.file_path)
-        except Exception as e:
-            logger.error(f"Error deleting file: {e}")
+        files = [wiki_image.file_path, *(variant.file_path for variant in wiki_image.variants)]
         
         # Удаляем запись из БД
         await session.delete(wiki_image)
-        await session.commit()
+        if wiki_image.content_hash:
+            # Файл удаляется только вместе с последней ссылкой на blob
+            result = await session.execute(
+                update(ImageBlob)
+                .where(ImageBlob.content_hash == wiki_image.content_hash)
+                .values(ref_count=ImageBlob.ref_count - 1)
+                .returning(ImageBlob.ref_count)
+            )
+            ref_count = result.scalar_one_or_none()
+            if ref_count is not None and ref_count > 0:
+                files = []
+            else:
+                await session.execute(
+                    delete(ImageBlob).where(ImageBlob.content_hash == wiki_image.content_hash)
+                )
+        person_id = await _touch_wiki(session, wiki_image.wiki_id)
+
+        # Файл и его производные удаляются только после фиксации
+        unit_of_work.after_commit(session, _remove_files, files)
+        unit_of_work.after_commit(session, forget_image_files, image_id)
+        unit_of_work.after_commit(session, cache.forget_wiki, wiki_image.wiki_id)
+        unit_of_work.after_commit(session, cache.forget_person, person_id=person_id)
+        await unit_of_work.commit(session)
         return True
 
-async def get_wiki_with_images(wiki_id: int):
-    """Получить wiki с изображениями"""
-    async with async_session() as session:
-        query = select(Wiki).where(Wiki.id == wiki_id)
+class ImageFiles:
+    """Метаданные файлов изображения, достаточные для отдачи без обращения к БД и диску"""
+
+    __slots__ = ("image_id", "original_filename", "uploaded_at", "files")
+
+    def __init__(self, wiki_image: WikiImage) -> None:
+        self.image_id = wiki_image.id
+        self.original_filename = wiki_image.original_filename
+        self.uploaded_at = wiki_image.uploaded_at
+        # (размер, формат, путь, mime-тип, размер файла)
+        self.files = [
+            (images.ORIGINAL_SIZE, None, wiki_image.file_path, wiki_image.mime_type, wiki_image.file_size),
+            *(
+                (variant.size, variant.format, variant.file_path, variant.mime_type, variant.file_size)
+                for variant in wiki_image.variants
+            ),
+        ]
+
+    def choose(self, size: str, accepts_webp: bool):
+        """Самый легкий из файлов нужного размера и допустимого формата.
+        Возвращает (путь, mime-тип, размер файла)"""
+        candidates = [
+            (file_size, file_path, mime_type)
+            for file_size_name, file_format, file_path, mime_type, file_size in self.files
+            if file_size_name == size and (accepts_webp or file_format != "webp")
+        ]
+        if not candidates:
+            # Производных нет (старые загрузки или нет Pillow) - отдаем оригинал
+            _, _, file_path, mime_type, file_size = self.files[0]
+            return file_path, mime_type, file_size
+
+        file_size, file_path, mime_type = min(candidates)
+        return file_path, mime_type, file_size
+
+async def get_image_files(image_id: int, session=None) -> Optional[ImageFiles]:
+    """Получить метаданные файлов изображения (кэшируются в памяти)"""
+    use_cache = not unit_of_work.has_pending_writes(session)
+    if use_cache:
+        image_files = cache.image_files.get(image_id)
+        if image_files is not None:
+            return image_files
+
+    async with unit_of_work.session_scope(session) as session:
+        query = (
+            select(WikiImage)
+            .where(WikiImage.id == image_id)
+            .options(selectinload(WikiImage.variants))
+        )
         result = await session.execute(query)
-        wiki = result.scalar_one_or_none()
-        
-        if wiki:
-            # Загружаем изображения отдельным запросом
-            images_query = select(WikiImage).where(WikiImage.wiki_id == wiki_id)
-            images_result = await session.execute(images_query)
-            images = images_result.scalars().all()
-            
-            # Создаем словарь с данными wiki и изображениями
-            wiki_data = {
-                'id': wiki.id,
-                'person_id': wiki.person_id,
-                'description': wiki.description,
-                'created_at': wiki.created_at,
-                'updated_at': wiki.updated_at,
-                'created_by': wiki.created_by,
-                'images': images
-            }
-            return wiki_data
-        
+        wiki_image = result.scalar_one_or_none()
+
+    if wiki_image is None:
         return None
 
+    image_files = ImageFiles(wiki_image)
+    if use_cache:
+        cache.image_files.set(image_id, image_files)
+    return image_files
+
+def forget_image_files(image_id: int):
+    """Сбросить закэшированные метаданные файлов изображения"""
+    cache.image_files.pop(image_id)
+
+class WikiImageView:
+    """Поля изображения wiki без строки ORM: WikiView с ними хранится в кэше процесса"""
+
+    __slots__ = ("id", "filename", "original_filename", "file_size", "mime_type", "uploaded_at", "uploaded_by")
+
+    def __init__(self, wiki_image: WikiImage) -> None:
+        self.id = wiki_image.id
+        self.filename = wiki_image.filename
+        self.original_filename = wiki_image.original_filename
+        self.file_size = wiki_image.file_size
+        self.mime_type = wiki_image.mime_type
+        self.uploaded_at = wiki_image.uploaded_at
+        self.uploaded_by = wiki_image.uploaded_by
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "filename": self.filename,
+            "original_filename": self.original_filename,
+            "file_size": self.file_size,
+            "mime_type": self.mime_type,
+            "uploaded_at": self.uploaded_at.isoformat() if self.uploaded_at else None,
+            "uploaded_by": self.uploaded_by
+        }
+
+class WikiView:
+    """Wiki с изображениями для HTML-страницы и JSON API; не привязана к сессии"""
+
+    __slots__ = ("id", "person_id", "description", "created_at", "updated_at", "created_by", "images")
+
+    DATE_FORMAT = "%d.%m.%Y %H:%M"
+
+    def __init__(self, wiki: Wiki) -> None:
+        self.id = wiki.id
+        self.person_id = wiki.person_id
+        self.description = wiki.description
+        self.created_at = wiki.created_at
+        self.updated_at = wiki.updated_at
+        self.created_by = wiki.created_by
+        self.images = [WikiImageView(image) for image in wiki.images]
+
+    @property
+    def created_display(self) -> Optional[str]:
+        return self.created_at.strftime(self.DATE_FORMAT) if self.created_at else None
+
+    @property
+    def updated_display(self) -> Optional[str]:
+        return self.updated_at.strftime(self.DATE_FORMAT) if self.updated_at else None
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "person_id": self.person_id,
+            "description": self.description,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "created_by": self.created_by,
+            "images": [image.as_dict() for image in self.images],
+        }
+
+async def get_wiki_view(
+    wiki_id: Optional[int] = None, person_id: Optional[int] = None, session=None
+) -> Optional[WikiView]:
+    """Wiki по id или по персоне вместе с изображениями (запрос wiki и один
+    selectin-запрос изображений). Результат по id кэшируется в памяти"""
+    use_cache = wiki_id is not None and not unit_of_work.has_pending_writes(session)
+    if use_cache:
+        wiki_view = cache.wiki_with_images.get(wiki_id)
+        if wiki_view is not None:
+            return wiki_view
+
+    query = select(Wiki).options(selectinload(Wiki.images))
+    if wiki_id is not None:
+        query = query.where(Wiki.id == wiki_id)
+    else:
+        query = query.where(Wiki.person_id == person_id)
+
+    async with unit_of_work.session_scope(session) as session:
+        result = await session.execute(query)
+        wiki = result.scalars().first()
+        if wiki is None:
+            return None
+        wiki_view = WikiView(wiki)
+
+    if use_cache:
+        cache.wiki_with_images.set(wiki_id, wiki_view)
+    return wiki_view
+
@@ -1 +1 @@
-from . import database, Person_operation, Quotes_operation
+from . import database, Person_operation, Quotes_operation, Search_operation, Bulk_operation
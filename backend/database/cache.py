@@ -0,0 +1,199 @@
+import sys
+import time
+from collections import OrderedDict
+
+from backend.config import config
+from .replicas import replica_set
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Ограниченный по размеру LRU-кэш с временем жизни записей"""
+
+    def __init__(self, name: str, maxsize: int, ttl: float) -> None:
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key, default=None):
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            self.misses += 1
+            return default
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def accepts(self) -> bool:
+        # Сразу после записи реплика может вернуть старые данные: их не кэшируем
+        return self.maxsize > 0 and not replica_set.is_settling()
+
+    def set(self, key, value) -> None:
+        if not self.accepts():
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        self._evict()
+
+    def _evict(self) -> None:
+        while len(self._data) > self.maxsize:
+            self._remove(next(iter(self._data)))
+            self.evictions += 1
+
+    def _remove(self, key):
+        return self._data.pop(key)[1]
+
+    def pop(self, key, default=None):
+        if key not in self._data:
+            return default
+        self.invalidations += 1
+        return self._remove(key)
+
+    def keys(self):
+        return list(self._data)
+
+    def items(self):
+        return [(key, value) for key, (_, value) in self._data.items()]
+
+    def clear(self) -> None:
+        self.invalidations += len(self._data)
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+class FragmentCache(LRUCache):
+    """
+    Кэш отрисованных HTML-фрагментов. Ключ - (имя фрагмента, id сущности, версия),
+    кроме числа записей ограничен суммарным размером строк в памяти.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float, maxbytes: int) -> None:
+        super().__init__(name, maxsize, ttl)
+        self.maxbytes = maxbytes
+        self.nbytes = 0
+
+    def set(self, key, value: str) -> None:
+        size = sys.getsizeof(value)
+        if not self.accepts() or size > self.maxbytes:
+            return
+        if key in self._data:
+            self._remove(key)
+        self.nbytes += size
+        super().set(key, value)
+
+    def _evict(self) -> None:
+        super()._evict()
+        while self.nbytes > self.maxbytes:
+            self._remove(next(iter(self._data)))
+            self.evictions += 1
+
+    def _remove(self, key):
+        value = super()._remove(key)
+        self.nbytes -= sys.getsizeof(value)
+        return value
+
+    def clear(self) -> None:
+        super().clear()
+        self.nbytes = 0
+
+    def stats(self) -> dict:
+        return {**super().stats(), "bytes": self.nbytes, "maxbytes": self.maxbytes}
+
+
+def shared_ttl(cfg) -> float:
+    """
+    Время жизни записей, которые может изменить другой процесс Hypercorn.
+    Сброс после записи работает только в своем процессе, поэтому при нескольких
+    процессах устаревшая запись живет не дольше cache_workers_ttl_seconds.
+    """
+    if cfg.workers > 1:
+        return min(cfg.cache_ttl_seconds, cfg.cache_workers_ttl_seconds)
+    return cfg.cache_ttl_seconds
+
+
+person_by_name = LRUCache("person_by_name", config.cache_max_entries, shared_ttl(config))
+person_by_id = LRUCache("person_by_id", config.cache_max_entries, shared_ttl(config))
+wiki_with_images = LRUCache("wiki_with_images", config.cache_max_entries, shared_ttl(config))
+# Записи изображений не меняются, сбрасываются только при удалении
+image_files = LRUCache("image_files", config.cache_max_entries, shared_ttl(config))
+# Ключ фрагмента содержит версию персоны, поэтому изменения в другом процессе
+# его не затрагивают: полный срок жизни безопасен
+fragments = FragmentCache(
+    "fragments", config.cache_max_entries, config.cache_ttl_seconds, config.fragment_cache_max_bytes
+)
+
+CACHES = (person_by_name, person_by_id, wiki_with_images, image_files, fragments)
+
+# Фрагменты, зависящие от списка всех персон, а не от одной
+LISTING_FRAGMENTS = ("person_cards",)
+
+
+def remember_person(person) -> None:
+    person_by_name.set(person.full_name, person)
+    person_by_id.set(person.id, person)
+
+def forget_person(person_id=None, full_name=None) -> None:
+    """Сбросить персону из обоих кэшей по id и/или имени, а также ее HTML-фрагменты"""
+    forget_fragments(person_id)
+    if person_id is not None:
+        person = person_by_id.pop(person_id)
+        if person is not None:
+            person_by_name.pop(person.full_name)
+        else:
+            # Запись по id могла быть вытеснена раньше записи по имени
+            for name, cached in person_by_name.items():
+                if cached.id == person_id:
+                    person_by_name.pop(name)
+    if full_name is not None:
+        person = person_by_name.pop(full_name)
+        if person is not None:
+            person_by_id.pop(person.id)
+
+def forget_fragments(person_id=None) -> None:
+    """
+    Сбросить фрагменты персоны и списка персон. Версия в ключе и так не даст
+    отдать устаревший фрагмент, сброс освобождает память сразу.
+    """
+    for key in fragments.keys():
+        name, entity_id, _ = key
+        if name in LISTING_FRAGMENTS or (person_id is not None and entity_id == person_id):
+            fragments.pop(key)
+
+def forget_wiki(wiki_id: int) -> None:
+    wiki_with_images.pop(wiki_id)
+
+def clear() -> None:
+    for cache in CACHES:
+        cache.clear()
+
+def stats() -> dict:
+    return {cache.name: cache.stats() for cache in CACHES}
@@ -1,30 +1,124 @@
 import logging
 import os
+import re
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, Text, String
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, Text, String, event, func, inspect, select, text, update
+from sqlalchemy.engine import URL, make_url
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import declarative_base, relationship, sessionmaker
 
+from backend import metrics
 from backend.config import config
+from . import pool, replicas
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.ERROR)
 
+
+def build_database_url(cfg) -> URL:
+    """
+    Build the SQLAlchemy URL for the engine selected in the config.
+    """
+    if cfg.database_engine == "postgresql":
+        return URL.create(
+            "postgresql+asyncpg",
+            username=cfg.database_user,
+            password=cfg.database_password,
+            host=cfg.database_host,
+            port=int(cfg.database_port),
+            database=cfg.database_name,
+            query={"prepared_statement_cache_size": str(cfg.database_statement_cache_size)},
+        )
+    if cfg.database_engine == "sqlite":
+        return URL.create("sqlite+aiosqlite", database=cfg.database_path)
+    raise ValueError(f"Unsupported database_engine: {cfg.database_engine}")
+
+def build_engine_options(cfg, backend_name=None) -> dict:
+    """
+    Pool and driver options for create_async_engine.
+    backend_name ("sqlite" or "postgresql") defaults to cfg.database_engine.
+    """
+    options = {
+        "echo": cfg.debug_mode,
+        "poolclass": pool.TimedQueuePool,
+        "pool_size": cfg.database_pool_size,
+        "max_overflow": cfg.database_max_overflow,
+        "pool_timeout": cfg.database_pool_timeout,
+    }
+    if (backend_name or cfg.database_engine) == "postgresql":
+        options.update(
+            pool_pre_ping=True,
+            pool_recycle=cfg.database_pool_recycle,
+            connect_args={"statement_cache_size": cfg.database_statement_cache_size},
+        )
+    return options
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA mmap_size={int(config.sqlite_mmap_size)}")
+    # Отрицательное значение cache_size задается в килобайтах
+    cursor.execute(f"PRAGMA cache_size=-{int(config.sqlite_cache_size_kb)}")
+    cursor.execute(f"PRAGMA busy_timeout={int(config.sqlite_busy_timeout_ms)}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+def _set_sqlite_replica_pragmas(dbapi_connection, connection_record):
+    # Режим журнала реплики задает тот, кто ее обновляет; запись в нее запрещена
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA mmap_size={int(config.sqlite_mmap_size)}")
+    cursor.execute(f"PRAGMA cache_size=-{int(config.sqlite_cache_size_kb)}")
+    cursor.execute(f"PRAGMA busy_timeout={int(config.sqlite_busy_timeout_ms)}")
+    cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+def create_engine(url, replica: bool = False):
+    """
+    Async engine with the pool options and instrumentation used by the app.
+    """
+    url = make_url(url)
+    new_engine = create_async_engine(url, **build_engine_options(config, url.get_backend_name()))
+    if new_engine.dialect.name == "sqlite":
+        pragmas = _set_sqlite_replica_pragmas if replica else _set_sqlite_pragmas
+        event.listen(new_engine.sync_engine, "connect", pragmas)
+    if config.metrics_enabled:
+        metrics.instrument_engine(new_engine.sync_engine)
+    return new_engine
+
 # Async Database Engine configuration
-#DATABASE_URL = f"postgresql+asyncpg://{config.database_user}:{config.database_password}@{config.database_host}/{config.database_name}"
-DATABASE_URL = f"sqlite+aiosqlite:///fanbase.db"
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=config.debug_mode,
-    #future=True,
-    #pool_pre_ping=True,
-    #pool_size=10,
-    #max_overflow=20,
-)
+engine = create_engine(build_database_url(config))
+
+# Read replicas: reads are routed by replicas.RoutingSession
+replicas.replica_set.configure([create_engine(url, replica=True) for url in config.database_replicas])
+
+def pool_status() -> dict:
+    """
+    Current pool utilization plus cumulative checkout wait statistics.
+    """
+    engine_pool = engine.pool
+    capacity = config.database_pool_size + config.database_max_overflow
+    checked_out = engine_pool.checkedout()
+    return {
+        "size": engine_pool.size(),
+        "checked_out": checked_out,
+        "overflow": engine_pool.overflow(),
+        "capacity": capacity,
+        "utilization": checked_out / capacity if capacity else 0.0,
+        **pool.stats.as_dict(),
+    }
+
+if config.metrics_enabled:
+    metrics.instrument_pool(pool_status)
+    if replicas.replica_set.enabled:
+        metrics.Gauge(
+            "fanbase_db_replicas_healthy", "Read replicas currently receiving reads",
+            replicas.replica_set.healthy_count,
+        )
 
 async_session = sessionmaker(
-    engine, class_=AsyncSession, expire_on_commit=False
+    engine, class_=AsyncSession, sync_session_class=replicas.RoutingSession, expire_on_commit=False
 )
 
 Base = declarative_base()
@@ -34,6 +128,11 @@ class Person(Base):
 
     id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     full_name = Column(Text, nullable=False, unique=True, index=True)
+    # Денормализованный счетчик цитат, поддерживается в Quotes_operation
+    quote_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Версия растет при любом изменении персоны, ее цитат, wiki и изображений
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=True)
 
     wiki = relationship("Wiki", back_populates="person", uselist=False)
 
@@ -71,17 +170,101 @@ class WikiImage(Base):
     mime_type = Column(String(100), nullable=False)
     uploaded_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     uploaded_by = Column(String(100), nullable=True)
+    # SHA-256 содержимого; у загрузок до появления image_blobs отсутствует
+    content_hash = Column(String(64), ForeignKey('image_blobs.content_hash'), nullable=True, index=True)
 
     wiki = relationship("Wiki", back_populates="images")
+    variants = relationship("WikiImageVariant", back_populates="image", cascade="all, delete-orphan")
+
+class ImageBlob(Base):
+    __tablename__ = "image_blobs"
+
+    content_hash = Column(String(64), primary_key=True)
+    file_path = Column(String(500), nullable=False)
+    file_size = Column(Integer, nullable=False)
+    mime_type = Column(String(100), nullable=False)
+    ref_count = Column(Integer, nullable=False, default=1)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+class WikiImageVariant(Base):
+    __tablename__ = "wiki_image_variants"
+
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
+    image_id = Column(Integer, ForeignKey('wiki_images.id'), nullable=False, index=True)
+    size = Column(String(20), nullable=False)  # thumb, medium, original
+    format = Column(String(10), nullable=False)  # webp, jpeg, png
+    file_path = Column(String(500), nullable=False)
+    file_size = Column(Integer, nullable=False)
+    mime_type = Column(String(100), nullable=False)
+    width = Column(Integer, nullable=False)
+    height = Column(Integer, nullable=False)
 
+    image = relationship("WikiImage", back_populates="variants")
 
 
+def bump_person_version(person_id, **values):
+    """
+    UPDATE that increments Person.version and sets updated_at, plus extra values.
+    person_id may be a plain id or a scalar subquery.
+    """
+    return (
+        update(Person)
+        .where(Person.id == person_id)
+        .values(version=Person.version + 1, updated_at=datetime.utcnow(), **values)
+    )
+
+def quote_count_repair_statement():
+    """
+    UPDATE that recomputes Person.quote_count from the quotes table.
+    """
+    quote_count = (
+        select(func.count(Quotes.id))
+        .where(Quotes.person_id == Person.id)
+        .scalar_subquery()
+    )
+    return update(Person).values(quote_count=quote_count)
+
+_CONCURRENT_DDL_ERRORS = re.compile(r"already exists|duplicate column", re.IGNORECASE)
+
+def _add_missing_columns(sync_conn):
+    """
+    Add columns declared on the models but missing in already existing tables.
+    Returns a set of (table, column) pairs that were added.
+    """
+    inspector = inspect(sync_conn)
+    added = set()
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=sync_conn.dialect)}"
+            if column.server_default is not None:
+                ddl += f" DEFAULT {column.server_default.arg}"
+                if not column.nullable:
+                    ddl += " NOT NULL"
+            sync_conn.execute(text(ddl))
+            added.add((table.name, column.name))
+    return added
+
 async def init_db():
     """
     Initialize the database and create tables.
     """
-    async with engine.begin() as conn:
+    for attempt in range(2):
         try:
-            await conn.run_sync(Base.metadata.create_all)
+            async with engine.begin() as conn:
+                added = await conn.run_sync(_add_missing_columns)
+                await conn.run_sync(Base.metadata.create_all)
+                if ("person", "quote_count") in added:
+                    await conn.execute(quote_count_repair_statement())
+            return
         except Exception as error:
+            # Another process created the same table or column first:
+            # the second pass finds it and skips it
+            if attempt == 0 and _CONCURRENT_DDL_ERRORS.search(str(error)):
+                continue
             logger.error(f"Error creating tables: {error}")
+            return
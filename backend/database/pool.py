@@ -0,0 +1,79 @@
+import contextvars
+import logging
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+logger = logging.getLogger(__name__)
+
+# Ожидание соединения дольше этого порога попадает в лог
+SLOW_CHECKOUT_SECONDS = 0.1
+
+
+class PoolStats:
+    """Счетчики выдачи соединений из пула"""
+
+    __slots__ = ("checkouts", "timeouts", "wait_total", "wait_max")
+
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, waited: float) -> None:
+        self.checkouts += 1
+        self.wait_total += waited
+        if waited > self.wait_max:
+            self.wait_max = waited
+
+    def as_dict(self) -> dict:
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_total": self.wait_total,
+            "wait_max": self.wait_max,
+            "wait_avg": self.wait_total / self.checkouts if self.checkouts else 0.0,
+        }
+
+
+stats = PoolStats()
+
+# Счетчик выдач соединений в текущем контексте (например, в рамках HTTP-запроса)
+_context_checkouts = contextvars.ContextVar("pool_context_checkouts", default=None)
+
+
+class CheckoutCounter:
+    __slots__ = ("count",)
+
+    def __init__(self) -> None:
+        self.count = 0
+
+
+def count_checkouts() -> CheckoutCounter:
+    """Начать подсчет выдач соединений в текущем контексте"""
+    counter = CheckoutCounter()
+    _context_checkouts.set(counter)
+    return counter
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool, который измеряет время ожидания соединения"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            stats.timeouts += 1
+            logger.error(f"Connection pool exhausted: {self.status()}")
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            stats.record(waited)
+            counter = _context_checkouts.get()
+            if counter is not None:
+                counter.count += 1
+            if waited > SLOW_CHECKOUT_SECONDS:
+                logger.warning(f"Slow connection checkout: {waited * 1000:.1f} ms, {self.status()}")
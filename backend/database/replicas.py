@@ -0,0 +1,218 @@
+"""
+Разделение чтения и записи между основной базой и репликами только для чтения.
+
+Сессии создаются с классом RoutingSession: SELECT уходят на одну из исправных
+реплик (по кругу, одна реплика на сессию, чтобы чтения запроса были
+согласованы между собой), все остальное - на основную базу. После первой
+записи сессия читает только из основной базы. Запрос, который что-то записал,
+получает cookie PRIMARY_COOKIE: следующие запросы этого клиента в течение
+database_replica_lag_seconds тоже читают из основной базы и видят свои записи.
+
+Реплика считается неисправной после ошибки соединения и возвращается в работу,
+когда проходит проверка SELECT 1. Если исправных реплик нет, чтение идет в
+основную базу.
+"""
+import asyncio
+import contextvars
+import logging
+import re
+import time
+
+from sqlalchemy import exc, event, text
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import CompoundSelect, Select, TextClause
+
+from backend import metrics
+from backend.config import config
+
+logger = logging.getLogger(__name__)
+
+PRIMARY_COOKIE = "fanbase_primary"
+
+# Ключи в Session.info
+_WROTE = "replicas_wrote"
+_REPLICA = "replicas_replica"
+
+_READ_SQL_RE = re.compile(r"\s*SELECT\b", re.IGNORECASE)
+
+
+def _is_read(clause) -> bool:
+    if isinstance(clause, (Select, CompoundSelect)):
+        # SELECT ... FOR UPDATE блокирует строки и должен идти в основную базу
+        return clause._for_update_arg is None
+    if isinstance(clause, TextClause):
+        return _READ_SQL_RE.match(clause.text) is not None
+    return False
+
+
+class Replica:
+    __slots__ = ("engine", "name", "healthy")
+
+    def __init__(self, engine) -> None:
+        self.engine = engine
+        self.name = engine.url.render_as_string(hide_password=True)
+        self.healthy = True
+
+
+class RequestRouting:
+    """Маршрутизация чтений в рамках HTTP-запроса"""
+
+    __slots__ = ("read_primary", "wrote")
+
+    def __init__(self, read_primary: bool) -> None:
+        self.read_primary = read_primary
+        self.wrote = False
+
+
+_request_routing = contextvars.ContextVar("replicas_request_routing", default=None)
+
+def route_request(read_primary: bool = False) -> RequestRouting:
+    """Начать маршрутизацию для текущего контекста (запроса)"""
+    routing = RequestRouting(read_primary)
+    _request_routing.set(routing)
+    return routing
+
+def note_write() -> None:
+    """Запрос записал данные: дальше он читает из основной базы"""
+    routing = _request_routing.get()
+    if routing is not None:
+        routing.wrote = True
+        routing.read_primary = True
+
+
+class ReplicaSet:
+    def __init__(self) -> None:
+        self.replicas = []
+        self._next = 0
+        # Время последней фиксации записи в этом процессе
+        self.last_write = float("-inf")
+        self._checker = None
+
+    def configure(self, engines) -> None:
+        self.replicas = [Replica(engine) for engine in engines]
+        for replica in self.replicas:
+            event.listen(replica.engine.sync_engine, "handle_error", self._handle_error(replica))
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def healthy_count(self) -> int:
+        return sum(replica.healthy for replica in self.replicas)
+
+    def choose(self):
+        """Следующая исправная реплика по кругу или None"""
+        count = len(self.replicas)
+        for offset in range(count):
+            index = (self._next + offset) % count
+            if self.replicas[index].healthy:
+                self._next = (index + 1) % count
+                return self.replicas[index]
+        return None
+
+    def is_settling(self) -> bool:
+        """Недавняя запись могла еще не дойти до реплик"""
+        return self.enabled and time.monotonic() - self.last_write < config.database_replica_lag_seconds
+
+    def _handle_error(self, replica: Replica):
+        def handle_error(exception_context):
+            if exception_context.is_disconnect or isinstance(
+                exception_context.sqlalchemy_exception, (exc.OperationalError, exc.InterfaceError)
+            ):
+                self._set_health(replica, False, exception_context.original_exception)
+        return handle_error
+
+    def _set_health(self, replica: Replica, healthy: bool, error=None) -> None:
+        if replica.healthy == healthy:
+            return
+        replica.healthy = healthy
+        if healthy:
+            logger.warning(f"Read replica {replica.name} is back")
+        else:
+            logger.error(f"Read replica {replica.name} failed, reads fall back: {error}")
+
+    @staticmethod
+    async def _ping(replica: Replica) -> None:
+        async with replica.engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    async def check(self) -> None:
+        """Проверить все реплики запросом SELECT 1"""
+        for replica in self.replicas:
+            try:
+                await asyncio.wait_for(self._ping(replica), config.database_replica_check_seconds)
+            except Exception as e:
+                self._set_health(replica, False, e)
+            else:
+                self._set_health(replica, True)
+
+    async def _run_checks(self) -> None:
+        while True:
+            await asyncio.sleep(config.database_replica_check_seconds)
+            await self.check()
+
+    async def start(self) -> None:
+        """Проверить реплики и запустить периодическую проверку"""
+        if not self.enabled:
+            return
+        await self.check()
+        self._checker = asyncio.get_running_loop().create_task(self._run_checks(), context=contextvars.Context())
+
+    async def stop(self) -> None:
+        if self._checker is not None:
+            self._checker.cancel()
+            try:
+                await self._checker
+            except asyncio.CancelledError:
+                pass
+            self._checker = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+
+replica_set = ReplicaSet()
+
+
+class RoutingSession(Session):
+    """Session, которая отправляет чтения на реплики"""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        primary = super().get_bind(mapper, clause=clause, **kw)
+        if not replica_set.enabled:
+            return primary
+
+        if self._flushing or not _is_read(clause):
+            self.info[_WROTE] = True
+            note_write()
+            return primary
+
+        routing = _request_routing.get()
+        if self.info.get(_WROTE) or (routing is not None and routing.read_primary):
+            metrics.db_reads.inc(target="primary")
+            return primary
+
+        replica = self.info.get(_REPLICA)
+        if replica is None or not replica.healthy:
+            replica = replica_set.choose()
+            if replica is None:
+                metrics.db_reads.inc(target="primary")
+                return primary
+            self.info[_REPLICA] = replica
+        metrics.db_reads.inc(target="replica")
+        return replica.engine.sync_engine
+
+    def execute(self, statement, *args, **kw):
+        try:
+            return super().execute(statement, *args, **kw)
+        except exc.DBAPIError:
+            replica = self.info.get(_REPLICA)
+            if replica is None or replica.healthy or not _is_read(statement):
+                raise
+            # Реплика только что отказала: чтение повторяется на другой реплике или в основной базе
+            return super().execute(statement, *args, **kw)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _remember_write(session):
+    if session.info.get(_WROTE):
+        replica_set.last_write = time.monotonic()
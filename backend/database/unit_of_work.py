@@ -0,0 +1,131 @@
+import contextlib
+import contextvars
+import logging
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .database import async_session
+
+logger = logging.getLogger(__name__)
+
+# Ключи в Session.info
+_SHARED = "unit_of_work_shared"
+_AFTER_COMMIT = "unit_of_work_after_commit"
+_HAS_WRITES = "unit_of_work_has_writes"
+
+
+def shared_session():
+    """Новая сессия, в которой commit() операций делает только flush:
+    фиксирует ее владелец (запрос или пакет очереди записи)"""
+    session = async_session()
+    session.info[_SHARED] = True
+    return session
+
+
+class RequestScope:
+    """Одна сессия и одна транзакция на весь запрос. Сессия открывается лениво"""
+
+    __slots__ = ("session", "closed")
+
+    def __init__(self) -> None:
+        self.session = None
+        self.closed = False
+
+    def get_session(self):
+        if self.session is None:
+            self.session = shared_session()
+        return self.session
+
+    async def commit(self) -> None:
+        if self.session is not None:
+            await self.session.commit()
+
+    async def close(self) -> None:
+        self.closed = True
+        if self.session is not None:
+            # Незафиксированные изменения откатываются при закрытии
+            await self.session.close()
+            self.session = None
+
+
+_current_scope = contextvars.ContextVar("unit_of_work_scope", default=None)
+
+def begin_scope() -> contextvars.Token:
+    """Открыть область общей сессии для текущего контекста (запроса)"""
+    return _current_scope.set(RequestScope())
+
+def current_scope():
+    scope = _current_scope.get()
+    if scope is None or scope.closed:
+        return None
+    return scope
+
+async def end_scope(token: contextvars.Token, commit: bool) -> None:
+    """Зафиксировать (если commit) и закрыть общую сессию области"""
+    scope = _current_scope.get()
+    try:
+        if commit and scope is not None:
+            await scope.commit()
+    finally:
+        if scope is not None:
+            await scope.close()
+        _current_scope.reset(token)
+
+@contextlib.asynccontextmanager
+async def session_scope(session=None):
+    """
+    Сессия для операции: переданная явно, общая сессия запроса
+    или собственная, которая закрывается по выходу из блока.
+    """
+    if session is None:
+        scope = current_scope()
+        if scope is not None:
+            session = scope.get_session()
+    if session is not None:
+        yield session
+        return
+
+    async with async_session() as session:
+        yield session
+
+def is_shared(session) -> bool:
+    return session.info.get(_SHARED, False)
+
+async def commit(session) -> None:
+    """Commit для собственной сессии; для общей - только flush,
+    фиксация выполняется один раз в конце запроса"""
+    if is_shared(session):
+        await session.flush()
+        session.info[_HAS_WRITES] = True
+    else:
+        await session.commit()
+
+def after_commit(session, callback, *args, **kwargs) -> None:
+    """Выполнить callback после фиксации транзакции (сброс кэша, удаление файлов).
+    При откате callback отбрасывается"""
+    session.info.setdefault(_AFTER_COMMIT, []).append((callback, args, kwargs))
+
+def has_pending_writes(session=None) -> bool:
+    """Есть ли в общей сессии записи, еще не зафиксированные в БД.
+    Пока они есть, кэш чтения не используется и не заполняется"""
+    if session is None:
+        scope = current_scope()
+        session = scope.session if scope is not None else None
+    return session is not None and session.info.get(_HAS_WRITES, False)
+
+
+@event.listens_for(Session, "after_commit")
+def _run_after_commit(sync_session):
+    sync_session.info.pop(_HAS_WRITES, None)
+    for callback, args, kwargs in sync_session.info.pop(_AFTER_COMMIT, ()):
+        try:
+            callback(*args, **kwargs)
+        except Exception as e:
+            logger.error(f"Error in after-commit callback {callback.__name__}: {e}")
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_after_commit(sync_session, previous_transaction):
+    if not sync_session.in_transaction():
+        sync_session.info.pop(_HAS_WRITES, None)
+        sync_session.info.pop(_AFTER_COMMIT, None)
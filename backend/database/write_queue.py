@@ -0,0 +1,153 @@
+"""
+Очередь записи с групповой фиксацией (group commit).
+
+При write_queue_enabled операции, помеченные @queued, не выполняются в сессии
+запроса, а передаются единственному писателю. Он собирает пачку (до
+write_queue_max_batch операций, ожидая до write_queue_window_ms после первой),
+выполняет все операции в одной транзакции и фиксирует ее одним commit. Для
+SQLite это один fsync и одна блокировка записи на пачку вместо борьбы за
+блокировку между запросами.
+
+Если хотя бы одна операция пачки падает, пачка откатывается и каждая операция
+выполняется повторно в своей транзакции: каждый вызывающий получает свой
+результат или свое исключение.
+"""
+import asyncio
+import contextvars
+import functools
+import logging
+import time
+
+from backend import metrics
+from backend.config import config
+from . import replicas, unit_of_work
+
+logger = logging.getLogger(__name__)
+
+
+class _Item:
+    __slots__ = ("operation", "args", "kwargs", "future", "enqueued_at")
+
+    def __init__(self, operation, args, kwargs, future) -> None:
+        self.operation = operation
+        self.args = args
+        self.kwargs = kwargs
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+
+    def resolve(self, result=None, error=None) -> None:
+        # Вызывающий мог уйти (клиент отключился), операция при этом уже выполнена
+        if self.future.done():
+            return
+        if error is not None:
+            self.future.set_exception(error)
+        else:
+            self.future.set_result(result)
+
+
+_queue = None
+_writer = None
+
+
+def is_enabled() -> bool:
+    return config.write_queue_enabled
+
+def _ensure_writer() -> asyncio.Queue:
+    global _queue, _writer
+    loop = asyncio.get_running_loop()
+    if _writer is None or _writer.done() or _writer.get_loop() is not loop:
+        _queue = asyncio.Queue()
+        # Писатель не должен унаследовать сессию запроса, который его запустил
+        _writer = loop.create_task(_run(_queue), context=contextvars.Context())
+    return _queue
+
+async def submit(operation, args=(), kwargs=None):
+    """Поставить операцию в очередь и дождаться ее фиксации"""
+    future = asyncio.get_running_loop().create_future()
+    _ensure_writer().put_nowait(_Item(operation, args, kwargs or {}, future))
+    return await future
+
+def queued(operation):
+    """
+    Декоратор операции записи с параметром session. Вызов без session при включенной
+    очереди идет через писателя; с явной сессией или когда сессия запроса уже
+    содержит незафиксированные записи - выполняется как обычно.
+    """
+    @functools.wraps(operation)
+    async def wrapper(*args, session=None, **kwargs):
+        if session is not None or not is_enabled() or unit_of_work.has_pending_writes():
+            return await operation(*args, session=session, **kwargs)
+        try:
+            return await submit(operation, args, kwargs)
+        finally:
+            # Запись выполнил писатель в своем контексте, а читать свои записи должен запрос
+            replicas.note_write()
+
+    return wrapper
+
+
+async def _run(queue: asyncio.Queue):
+    window = config.write_queue_window_ms / 1000
+    while True:
+        batch = [await queue.get()]
+        if window > 0 and len(batch) < config.write_queue_max_batch:
+            await asyncio.sleep(window)
+        while len(batch) < config.write_queue_max_batch and not queue.empty():
+            batch.append(queue.get_nowait())
+        try:
+            await _commit_batch(batch)
+        except Exception as e:
+            # Писатель не должен останавливаться из-за одной пачки
+            logger.error(f"Write queue batch failed: {e}")
+            for item in batch:
+                item.resolve(error=e)
+        finally:
+            for _ in batch:
+                queue.task_done()
+
+async def _commit_batch(batch):
+    started = time.perf_counter()
+    for item in batch:
+        metrics.write_queue_wait.observe(started - item.enqueued_at)
+    metrics.write_batch_size.observe(len(batch))
+
+    results = []
+    try:
+        async with unit_of_work.shared_session() as session:
+            for item in batch:
+                results.append(await item.operation(*item.args, session=session, **item.kwargs))
+            await session.commit()
+    except Exception as e:
+        if len(batch) == 1:
+            batch[0].resolve(error=e)
+            return
+        logger.warning(f"Write batch of {len(batch)} operations failed ({e}), retrying one by one")
+        metrics.write_batch_retries.inc()
+        for item in batch:
+            await _run_single(item)
+        return
+
+    for item, result in zip(batch, results):
+        item.resolve(result)
+
+async def _run_single(item: _Item):
+    try:
+        # Без сессии операция открывает и фиксирует собственную
+        item.resolve(await item.operation(*item.args, **item.kwargs))
+    except Exception as e:
+        item.resolve(error=e)
+
+async def stop():
+    """Дождаться фиксации уже поставленных операций и остановить писателя"""
+    global _queue, _writer
+    if _writer is None:
+        return
+    if not _writer.done() and _writer.get_loop() is asyncio.get_running_loop():
+        await _queue.join()
+        _writer.cancel()
+        try:
+            await _writer
+        except asyncio.CancelledError:
+            pass
+    _queue = None
+    _writer = None
@@ -0,0 +1,18 @@
+from quart import render_template
+from markupsafe import Markup
+
+from .database import cache
+
+
+async def render(name: str, entity_id, version, template: str, load) -> Markup:
+    """
+    Отрисованный фрагмент страницы из кэша. Ключ включает версию сущности,
+    поэтому после записи фрагмент перерисовывается; load - корутина-функция,
+    возвращающая контекст шаблона, вызывается только при промахе.
+    """
+    key = (name, entity_id, version)
+    html = cache.fragments.get(key)
+    if html is None:
+        html = await render_template(template, **await load())
+        cache.fragments.set(key, html)
+    return Markup(html)
@@ -0,0 +1,54 @@
+import hashlib
+from datetime import datetime, timezone
+from typing import Optional
+
+from quart import Response, request
+
+# Год - принятый предел max-age для неизменяемых ресурсов
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+def make_etag(*parts) -> str:
+    """Строгий ETag из версии сущности: одинаковые части дают одинаковое тело ответа"""
+    return hashlib.sha1(":".join(str(part) for part in parts).encode()).hexdigest()
+
+def _as_http_date(value: Optional[datetime]) -> Optional[datetime]:
+    # В базе хранится naive UTC, а HTTP-даты имеют точность до секунды
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.replace(microsecond=0)
+
+def set_validators(response: Response, etag: str, last_modified: Optional[datetime] = None) -> Response:
+    response.set_etag(etag)
+    last_modified = _as_http_date(last_modified)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # Браузер хранит ответ, но перепроверяет его при каждом запросе
+    response.cache_control.no_cache = True
+    return response
+
+def set_immutable(response: Response) -> Response:
+    """Для ресурсов, содержимое которых под данным URL никогда не меняется"""
+    response.cache_control.public = True
+    response.cache_control.max_age = IMMUTABLE_MAX_AGE
+    response.cache_control.immutable = True
+    return response
+
+def not_modified(etag: str, last_modified: Optional[datetime] = None) -> Optional[Response]:
+    """Ответ 304, если валидаторы клиента совпали, иначе None"""
+    if request.method not in ("GET", "HEAD"):
+        return None
+
+    if request.if_none_match:
+        # If-None-Match имеет приоритет над If-Modified-Since
+        if not request.if_none_match.contains_weak(etag):
+            return None
+    else:
+        last_modified = _as_http_date(last_modified)
+        since = request.if_modified_since
+        if last_modified is None or since is None or last_modified > since:
+            return None
+
+    return set_validators(Response(status=304), etag, last_modified)
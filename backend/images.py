@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow не установлен: производные изображения не создаются
+    Image = None
+
+from .config import config
+
+logger = logging.getLogger(__name__)
+
+# Максимальная сторона для каждого размера
+VARIANT_SIZES = {
+    "thumb": 320,
+    "medium": 1024,
+}
+ORIGINAL_SIZE = "original"
+SIZES = (*VARIANT_SIZES, ORIGINAL_SIZE)
+
+WEBP_QUALITY = 80
+JPEG_QUALITY = 85
+
+_executor = None
+
+
+def _save(image, path: str, image_format: str) -> dict:
+    if image_format == "WEBP":
+        image.save(path, "WEBP", quality=WEBP_QUALITY, method=4)
+        mime_type = "image/webp"
+    elif image_format == "JPEG":
+        image.convert("RGB").save(path, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+        mime_type = "image/jpeg"
+    else:
+        image.save(path, "PNG", optimize=True)
+        mime_type = "image/png"
+
+    return {
+        "format": image_format.lower(),
+        "file_path": path,
+        "file_size": os.path.getsize(path),
+        "mime_type": mime_type,
+        "width": image.width,
+        "height": image.height,
+    }
+
+def generate_variants(source_path: str) -> list:
+    """Создает уменьшенные копии и WebP рядом с оригиналом. Выполняется в отдельном процессе"""
+    base, _ = os.path.splitext(source_path)
+    variants = []
+
+    with Image.open(source_path) as source:
+        # JPEG остается JPEG, остальные форматы (PNG, GIF, WebP) сохраняются как PNG
+        fallback_format = "JPEG" if source.format == "JPEG" else "PNG"
+        image = ImageOps.exif_transpose(source)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA")
+
+        for size, max_side in VARIANT_SIZES.items():
+            resized = image.copy()
+            resized.thumbnail((max_side, max_side), Image.LANCZOS)
+            for image_format in ("WEBP", fallback_format):
+                ext = "jpg" if image_format == "JPEG" else image_format.lower()
+                variant = _save(resized, f"{base}_{size}.{ext}", image_format)
+                variant["size"] = size
+                variants.append(variant)
+
+        variant = _save(image, f"{base}_{ORIGINAL_SIZE}.webp", "WEBP")
+        variant["size"] = ORIGINAL_SIZE
+        variants.append(variant)
+
+    return variants
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: форк процесса с потоками aiosqlite и event loop небезопасен
+        _executor = ProcessPoolExecutor(
+            max_workers=config.image_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+async def create_variants(source_path: str) -> list:
+    """Сгенерировать производные изображения в пуле процессов, не блокируя event loop"""
+    if Image is None:
+        return []
+
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_get_executor(), generate_variants, source_path)
+    except Exception as e:
+        logger.error(f"Error generating variants for {source_path}: {e}")
+        return []
+
+def shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
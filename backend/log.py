@@ -0,0 +1,149 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows: вместо номера слота используется id процесса
+    fcntl = None
+
+TEXT_FORMAT = "%(asctime)s [%(levelname)-8s] - (%(funcName)s@%(filename)s:%(lineno)d): %(message)s"
+
+# Больше слотов не бывает: процессов Hypercorn и пула изображений на порядки меньше
+MAX_LOG_SLOTS = 1024
+
+_listener = None
+# Файл блокировок слотов остается открытым до выхода процесса, иначе блокировка снимется
+_slot_lock = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-строка на запись"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "function": record.funcName,
+            "file": record.filename,
+            "line": record.lineno,
+            "process": record.process,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    В отличие от стандартного prepare не склеивает traceback с сообщением:
+    он остается в exc_text и форматируется уже в потоке записи
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class SampleFilter(logging.Filter):
+    """
+    Пропускает только долю rate записей, помеченных extra={"sample": True}.
+    Остальные записи проходят всегда.
+    """
+
+    def __init__(self, rate: float) -> None:
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "sample", False):
+            return True
+        return self.rate >= 1 or random.random() < self.rate
+
+
+def _claim_slot(lock_path: str):
+    """
+    Наименьший номер, не занятый другим живым процессом: блокировка байта с этим
+    номером в общем файле. Система снимает ее при выходе процесса, поэтому после
+    перезапуска номера и файлы логов те же. None, если слот занять не удалось.
+    """
+    global _slot_lock
+    if fcntl is None:
+        return None
+    lock_file = open(lock_path, "a+b")
+    for slot in range(MAX_LOG_SLOTS):
+        try:
+            fcntl.lockf(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, slot)
+        except OSError:
+            continue
+        _slot_lock = lock_file
+        return slot
+    lock_file.close()
+    return None
+
+def _file_handler(cfg) -> logging.Handler:
+    # {slot} в имени дает каждому одновременно работающему процессу свой файл:
+    # ротация одного файла из нескольких процессов небезопасна. Файл открывается
+    # при первой записи, поэтому процессы пула изображений без записей файлов не создают
+    slot = None
+    if "{slot}" in cfg.log_file:
+        slot = _claim_slot(cfg.log_file.replace("{slot}", "slots") + ".lock")
+    path = cfg.log_file.format(pid=os.getpid(), slot=os.getpid() if slot is None else slot)
+    if cfg.log_rotation == "time":
+        return logging.handlers.TimedRotatingFileHandler(
+            path, when=cfg.log_rotate_when, backupCount=cfg.log_backup_count, encoding="utf-8", delay=True
+        )
+    if cfg.log_rotation == "size":
+        return logging.handlers.RotatingFileHandler(
+            path, maxBytes=cfg.log_max_bytes, backupCount=cfg.log_backup_count, encoding="utf-8", delay=True
+        )
+    return logging.FileHandler(path, encoding="utf-8", delay=True)
+
+def configure(cfg) -> None:
+    """
+    Настроить корневой логгер: записи уходят в очередь, а в файл их пишет
+    отдельный поток QueueListener, поэтому вызовы логгера не делают
+    файловый ввод-вывод в потоке event loop.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    handler = _file_handler(cfg)
+    handler.setFormatter(JsonFormatter() if cfg.log_format == "json" else logging.Formatter(TEXT_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(SampleFilter(cfg.log_sample_rate))
+
+    root = logging.getLogger()
+    root.setLevel(cfg.log_level.upper())
+    root.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, handler)
+    _listener.start()
+    # Дописать оставшиеся в очереди записи при выходе
+    atexit.register(shutdown)
+
+def shutdown() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
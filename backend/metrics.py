@@ -0,0 +1,228 @@
+"""
+Метрики в текстовом формате Prometheus без внешних зависимостей.
+
+Модуль не знает о Quart: приложение вызывает observe/inc из своих
+обработчиков, а render() отдает текст для /metrics. Значения обновляются
+из потока event loop без блокировок. Каждый процесс Hypercorn считает свои
+метрики отдельно.
+"""
+import bisect
+import re
+import time
+from functools import lru_cache
+
+from sqlalchemy import event
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Границы в секундах: от быстрых запросов к кэшу до медленных загрузок
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.kind}"
+        yield from self._samples()
+
+    def _samples(self):
+        return ()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames=()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        for key, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Gauge(_Metric):
+    """Значение вычисляется при каждом чтении /metrics"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, function) -> None:
+        super().__init__(name, documentation)
+        self._function = function
+
+    def _samples(self):
+        yield f"{self.name} {_format_value(self._function())}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [счетчики по корзинам (последняя - +Inf), сумма]
+        self._values = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1] += value
+
+    def _samples(self):
+        bounds = (*self.buckets, float("inf"))
+        for key, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(float(bound))}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# HTTP
+http_requests = Counter(
+    "fanbase_http_requests_total", "HTTP requests by endpoint, method and status",
+    ("endpoint", "method", "status"),
+)
+http_request_duration = Histogram(
+    "fanbase_http_request_duration_seconds", "Time to produce the response, by endpoint",
+    ("endpoint", "method"),
+)
+
+def observe_request(endpoint: str, method: str, status: int, duration: float) -> None:
+    http_requests.inc(endpoint=endpoint, method=method, status=status)
+    http_request_duration.observe(duration, endpoint=endpoint, method=method)
+
+# SQL
+sql_statements = Counter(
+    "fanbase_sql_statements_total", "SQL statements by operation and table",
+    ("operation", "table"),
+)
+sql_statement_duration = Histogram(
+    "fanbase_sql_statement_duration_seconds", "SQL statement execution time",
+    ("operation", "table"),
+)
+
+_TABLE_RE = re.compile(r'\b(?:FROM|INTO|UPDATE|JOIN)\s+"?(\w+)', re.IGNORECASE)
+
+@lru_cache(maxsize=1024)
+def _classify(statement: str):
+    """(операция, таблица) для текста запроса; тексты повторяются, поэтому кэшируется"""
+    stripped = statement.lstrip()
+    operation = stripped.split(None, 1)[0].upper() if stripped else "EMPTY"
+    match = _TABLE_RE.search(stripped)
+    return operation, match.group(1).lower() if match else ""
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["metrics_started"].pop()
+    operation, table = _classify(statement)
+    sql_statements.inc(operation=operation, table=table)
+    sql_statement_duration.observe(time.perf_counter() - started, operation=operation, table=table)
+
+def _handle_error(exception_context):
+    # after_cursor_execute не вызывается при ошибке, время начала снимается здесь
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("metrics_started"):
+        connection.info["metrics_started"].pop()
+
+def instrument_engine(sync_engine) -> None:
+    """Подписаться на события выполнения запросов движка SQLAlchemy"""
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+def instrument_pool(pool_status) -> None:
+    """Датчики пула соединений; pool_status - функция, возвращающая словарь состояния"""
+    for key, documentation in (
+        ("size", "Connections held by the pool"),
+        ("checked_out", "Connections currently checked out"),
+        ("overflow", "Overflow connections currently open"),
+        ("utilization", "Checked out connections divided by pool capacity"),
+        ("checkouts", "Total connection checkouts"),
+        ("timeouts", "Total checkout timeouts"),
+        ("wait_total", "Total seconds spent waiting for a connection"),
+        ("wait_max", "Longest wait for a connection in seconds"),
+    ):
+        Gauge(f"fanbase_db_pool_{key}", documentation, lambda key=key: pool_status()[key])
+
+# Реплики только для чтения
+db_reads = Counter(
+    "fanbase_db_reads_total", "Read statements by target when read replicas are configured: replica or primary",
+    ("target",),
+)
+
+# Очередь записи
+write_batch_size = Histogram(
+    "fanbase_write_batch_size", "Operations committed together by the write queue",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+write_queue_wait = Histogram(
+    "fanbase_write_queue_wait_seconds", "Time a write operation waited in the queue before its batch started",
+)
+write_batch_retries = Counter(
+    "fanbase_write_batch_retries_total", "Batches that failed and were retried operation by operation",
+)
+
+# Потоки цитат (SSE и WebSocket)
+stream_messages = Counter(
+    "fanbase_stream_messages_total", "Quote events published to stream subscribers", ("event",),
+)
+stream_dropped = Counter(
+    "fanbase_stream_dropped_total", "Events dropped from queues of slow stream subscribers",
+)
+
+# Загрузки
+upload_bytes = Counter("fanbase_upload_bytes_total", "Bytes received in image uploads")
+uploads = Counter(
+    "fanbase_uploads_total", "Image uploads by result: stored, deduplicated or rejected",
+    ("result",),
+)
@@ -0,0 +1,128 @@
+import hashlib
+import logging
+
+from quart import Blueprint, make_response, render_template, request, redirect
+
+from .database import Person_operation, Quotes_operation, WIKI_operation
+from .config import config
+from . import assets, fragments, http_cache
+
+pages_bp = Blueprint("pages", __name__)
+logger = logging.getLogger(__name__)
+
+@pages_bp.route("/", methods=["get", "post"])
+async def main_page():
+    if request.method == "POST":
+        form = await request.form
+        name = form.get("full_name")
+        person = await Person_operation.create_person(fullname= name)
+        return redirect(f"/{person.full_name}")
+
+    listing_version = await Person_operation.get_listing_version()
+    # HTML ссылается на ресурсы с хэшем в имени: новая сборка статики меняет и страницу
+    etag = http_cache.make_etag("index", assets.manifest_version(), *listing_version)
+    last_modified = assets.page_last_modified(listing_version[-1])
+    if (response := http_cache.not_modified(etag, last_modified)) is not None:
+        return response
+
+    async def load():
+        return {"person_list": await Person_operation.get_all_person_with_quote_count()}
+
+    person_cards = await fragments.render(
+        "person_cards", None, listing_version, "partials/person_cards.html", load
+    )
+    response = await make_response(await render_template("index.html", person_cards=person_cards))
+    return http_cache.set_validators(response, etag, last_modified)
+
+@pages_bp.route("/<full_name>", methods=["get", "post"])
+async def person_page(full_name):
+    person = await Person_operation.get_person_by_name(full_name=full_name)
+
+    if person is None:
+        return redirect("/")
+    
+    if request.method == "POST":
+        form = await request.form
+        quotes_text = form.get("quotes")
+        quotes = await Quotes_operation.create_quote(quote_text=quotes_text, person_id=person.id)
+        return redirect(f"/{person.full_name}")
+    
+    etag = http_cache.make_etag("person", assets.manifest_version(), person.id, person.version)
+    last_modified = assets.page_last_modified(person.updated_at)
+    if (response := http_cache.not_modified(etag, last_modified)) is not None:
+        return response
+
+    async def load():
+        quotes = await Quotes_operation.get_all_quote_by_person(person_id=person.id)
+        return {"person": person, "quotes": quotes}
+
+    quote_list = await fragments.render(
+        "quote_list", person.id, person.version, "partials/quote_list.html", load
+    )
+    response = await make_response(await render_template("person.html", person=person, quote_list=quote_list))
+    return http_cache.set_validators(response, etag, last_modified)
+
+@pages_bp.route("/wiki/<full_name>", methods=["get", "post"])
+async def wiki_person_page(full_name):
+    person = await Person_operation.get_person_by_name(full_name=full_name)
+
+    if person is None:
+        return redirect("/")
+    
+    if request.method == "POST":
+        form = await request.form
+        await WIKI_operation.save_wiki(person.id, form.get("description"), "user")
+        return redirect(f"/wiki/{person.full_name}")
+    
+    # Изменения wiki и изображений увеличивают версию персоны
+    etag = http_cache.make_etag("wiki_page", assets.manifest_version(), person.id, person.version)
+    last_modified = assets.page_last_modified(person.updated_at)
+    if (response := http_cache.not_modified(etag, last_modified)) is not None:
+        return response
+
+    async def load():
+        wiki = await WIKI_operation.get_wiki_view(person_id=person.id)
+        return {"person": person, "wiki": wiki}
+
+    wiki_body = await fragments.render(
+        "wiki_body", person.id, person.version, "partials/wiki_body.html", load
+    )
+    response = await make_response(await render_template("wiki_person.html", person=person, wiki_body=wiki_body))
+    return http_cache.set_validators(response, etag, last_modified)
+
+@pages_bp.route('/edit_quote/<int:quote_id>', methods=['POST'])
+async def edit_quote(quote_id):
+    form = await request.form
+    new_quote_text = form.get('quote_text')
+
+    quote = await Quotes_operation.update_quote(quote_id, new_quote_text)
+
+    person = await Person_operation.get_person_by_id(quote.person_id)
+
+    return redirect(f"/{person.full_name}")
+
+@pages_bp.route("/admin/<password>", methods=["get", "post"])
+async def admin_page(password):
+    if hashlib.sha3_512(password.encode()).hexdigest() != config.admin_password:
+        return redirect("/")
+    
+    if request.method == "POST":
+        form = await request.form
+        person_id = form.get("person_id")
+        new_name = form.get("new_name")
+
+        delete_quote_id = form.get("delete_quote_id")
+        delete_person_id = form.get("delete_person_id")
+
+        if person_id and new_name:
+            await Person_operation.update_person(int(person_id), new_name)
+        if delete_person_id:
+            await Person_operation.delete_person(int(delete_person_id))
+        if delete_quote_id:
+            await Quotes_operation.delete_quote(int(delete_quote_id))
+
+    return await render_template("admin.html")
+
+@pages_bp.route("/about", methods=["get"])
+async def about_page():
+    return await render_template("about.html")
@@ -0,0 +1,58 @@
+import asyncio
+import logging
+import os
+
+from hypercorn.config import Config as HypercornConfig
+from hypercorn.run import run as hypercorn_run
+
+logger = logging.getLogger(__name__)
+
+APPLICATION_PATH = "backend.app:app"
+
+
+def _worker_class() -> str:
+    try:
+        import uvloop  # noqa: F401
+    except ImportError:
+        return "asyncio"
+    return "uvloop"
+
+def build_hypercorn_config(cfg) -> HypercornConfig:
+    """Настройки Hypercorn из конфигурации приложения"""
+    hypercorn_config = HypercornConfig()
+    hypercorn_config.application_path = APPLICATION_PATH
+    hypercorn_config.bind = [f"{cfg.bind_host}:{cfg.app_port}"]
+    hypercorn_config.workers = cfg.workers
+    hypercorn_config.worker_class = _worker_class()
+    hypercorn_config.keep_alive_timeout = cfg.keep_alive_timeout
+    hypercorn_config.backlog = cfg.backlog
+    # По SIGTERM/SIGINT новые соединения не принимаются, текущие дорабатывают
+    # не дольше graceful_timeout секунд
+    hypercorn_config.graceful_timeout = cfg.graceful_timeout
+    return hypercorn_config
+
+async def _prepare_database() -> None:
+    from .app import prepare_database
+    from .database import database
+
+    try:
+        await prepare_database()
+    finally:
+        # Соединения привязаны к этому циклу событий, процессам они не нужны
+        await database.engine.dispose()
+
+def run(cfg) -> int:
+    """Запустить cfg.workers процессов Hypercorn, возвращает код выхода"""
+    from .app import SCHEMA_READY_ENV
+
+    # Схема и поисковый индекс готовятся один раз до запуска процессов, а не
+    # в каждом процессе одновременно. Процессы наследуют переменную окружения
+    asyncio.run(_prepare_database())
+    os.environ[SCHEMA_READY_ENV] = "1"
+
+    hypercorn_config = build_hypercorn_config(cfg)
+    logger.info(
+        f"Serving {APPLICATION_PATH} on {', '.join(hypercorn_config.bind)} "
+        f"with {hypercorn_config.workers} {hypercorn_config.worker_class} worker(s)"
+    )
+    return hypercorn_run(hypercorn_config)
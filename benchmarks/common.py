@@ -0,0 +1,75 @@
+"""Общие функции бенчмарков: рабочий каталог, конфигурация, статистика"""
+import hashlib
+import json
+import os
+import resource
+import subprocess
+import sys
+
+DEFAULT_WORKDIR = os.path.join("benchmarks", ".scratch")
+DATABASE_FILE = "bench.db"
+ADMIN_PASSWORD = "bench"
+
+
+def prepare_workdir(workdir: str, **overrides) -> str:
+    """
+    Создать рабочий каталог с отдельной конфигурацией и SQLite-базой и перейти в него.
+    Вызывать до импорта backend: конфигурация читается при импорте.
+    """
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if repo_root not in sys.path:
+        sys.path.insert(0, repo_root)
+
+    workdir = os.path.abspath(workdir)
+    os.makedirs(workdir, exist_ok=True)
+    config = {
+        "app_port": 8090,
+        "admin_password": hashlib.sha3_512(ADMIN_PASSWORD.encode()).hexdigest(),
+        "database_host": "127.0.0.1",
+        "database_user": "bench",
+        "database_password": "bench",
+        "database_name": "bench",
+        "database_engine": "sqlite",
+        "database_path": os.path.join(workdir, DATABASE_FILE),
+        "debug_mode": False,
+        **overrides,
+    }
+    config_path = os.path.join(workdir, "config.json")
+    with open(config_path, "w") as config_file:
+        json.dump(config, config_file, indent=2)
+
+    os.environ["FANBASE_CONFIG"] = config_path
+    # Загрузки и fanbase-<slot>.log пишутся относительно текущего каталога
+    os.chdir(workdir)
+    return workdir
+
+def percentile(sorted_samples, fraction: float) -> float:
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, max(0, round(fraction * len(sorted_samples)) - 1))
+    return sorted_samples[index]
+
+def peak_rss_mb() -> float:
+    """Пиковый RSS текущего процесса (ru_maxrss в Linux - в килобайтах)"""
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+def process_peak_rss_mb(pid: int):
+    """Пиковый RSS другого процесса по /proc (VmHWM), None если недоступно"""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
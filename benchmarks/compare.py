@@ -0,0 +1,56 @@
+"""
+Сравнение двух результатов benchmarks.load.
+
+    python -m benchmarks.compare before.json after.json
+
+Для пропускной способности рост - улучшение, для задержек и памяти - ухудшение.
+"""
+import argparse
+import json
+
+METRICS = (
+    ("throughput_rps", "rps", True),
+    ("p50_ms", "p50", False),
+    ("p95_ms", "p95", False),
+    ("p99_ms", "p99", False),
+)
+
+
+def _change(before, after) -> str:
+    if not before or before is None or after is None:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+def compare(before: dict, after: dict):
+    yield f"{'scenario':<16}{'metric':<8}{'before':>12}{'after':>12}{'change':>10}"
+    for scenario in sorted(set(before["scenarios"]) | set(after["scenarios"])):
+        old = before["scenarios"].get(scenario, {})
+        new = after["scenarios"].get(scenario, {})
+        for key, label, _ in METRICS:
+            yield (
+                f"{scenario:<16}{label:<8}{old.get(key, '-'):>12}{new.get(key, '-'):>12}"
+                f"{_change(old.get(key), new.get(key)):>10}"
+            )
+        if old.get("errors") or new.get("errors"):
+            yield f"{scenario:<16}{'errors':<8}{old.get('errors', '-'):>12}{new.get('errors', '-'):>12}"
+    yield (
+        f"{'process':<16}{'rss_mb':<8}{str(before.get('peak_rss_mb')):>12}{str(after.get('peak_rss_mb')):>12}"
+        f"{_change(before.get('peak_rss_mb'), after.get('peak_rss_mb')):>10}"
+    )
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args(argv)
+
+    with open(args.before) as before_file, open(args.after) as after_file:
+        before, after = json.load(before_file), json.load(after_file)
+    for meta in ("revision", "target", "concurrency"):
+        if before["meta"].get(meta) != after["meta"].get(meta):
+            print(f"note: {meta} differs: {before['meta'].get(meta)} vs {after['meta'].get(meta)}")
+    for line in compare(before, after):
+        print(line)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Генератор синтетического набора данных для бенчмарков.
+
+    python -m benchmarks.dataset --persons 10000 --quotes 1000000 --wikis 2000 --images 500
+
+Данные пишутся в отдельную SQLite-базу рабочего каталога (по умолчанию
+benchmarks/.scratch), рабочая config.json не используется. Генерация
+детерминирована при одинаковом --seed.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import shutil
+import time
+
+from .common import DATABASE_FILE, DEFAULT_WORKDIR, prepare_workdir
+
+WORDS = (
+    "лекция семинар экзамен зачет матанализ интеграл производная теорема доказательство "
+    "студент преподаватель кафедра сессия конспект задача пример формула график предел "
+    "ряд матрица вектор алгоритм программа функция множество граница ответ вопрос"
+).split()
+
+DISTINCT_IMAGES = 20
+
+
+def person_name(index: int) -> str:
+    return f"Преподаватель {index:06d}"
+
+def _sentence(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 20))).capitalize() + "."
+
+def _rows(rng: random.Random, persons: int, quotes: int):
+    # Каждая персона появляется хотя бы раз, даже без цитат
+    for index in range(persons):
+        yield person_name(index), None
+    for _ in range(quotes):
+        yield person_name(rng.randrange(persons)), _sentence(rng)
+
+def _images(rng: random.Random):
+    from PIL import Image
+
+    images = []
+    for index in range(DISTINCT_IMAGES):
+        buffer = io.BytesIO()
+        color = tuple(rng.randrange(256) for _ in range(3))
+        size = (rng.randint(400, 1600), rng.randint(300, 1200))
+        Image.new("RGB", size, color).save(buffer, "JPEG", quality=85)
+        images.append(buffer.getvalue())
+    return images
+
+async def generate(args) -> dict:
+    from werkzeug.datastructures import FileStorage
+
+    from backend import images as image_processing
+    from backend.database import database, Bulk_operation, Person_operation, Search_operation, WIKI_operation
+
+    rng = random.Random(args.seed)
+    started = time.monotonic()
+
+    await database.init_db()
+    await Search_operation.init_search_index()
+
+    stats = await Bulk_operation.import_rows(_rows(rng, args.persons, args.quotes), batch_size=5000)
+    imported = time.monotonic()
+
+    wikis = []
+    for index in rng.sample(range(args.persons), min(args.wikis, args.persons)):
+        person = await Person_operation.get_person_by_name(person_name(index))
+        wikis.append(await WIKI_operation.create_wiki(" ".join(_sentence(rng) for _ in range(3)), person.id, "bench"))
+
+    uploaded = 0
+    if wikis and args.images:
+        pool = _images(rng)
+        for index in range(args.images):
+            data = pool[index % len(pool)]
+            upload = FileStorage(io.BytesIO(data), filename=f"bench-{index}.jpg", content_type="image/jpeg")
+            await WIKI_operation.upload_wiki_image(rng.choice(wikis).id, upload, "bench")
+            uploaded += 1
+    image_processing.shutdown()
+
+    return {
+        "persons": args.persons,
+        "quotes": stats.quotes_created,
+        "wikis": len(wikis),
+        "images": uploaded,
+        "import_rows_per_second": round(stats.rows_per_second, 1),
+        "elapsed": round(time.monotonic() - started, 1),
+        "import_elapsed": round(imported - started, 1),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workdir", default=DEFAULT_WORKDIR)
+    parser.add_argument("--persons", type=int, default=10000)
+    parser.add_argument("--quotes", type=int, default=100000)
+    parser.add_argument("--wikis", type=int, default=1000)
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--force", action="store_true", help="remove the existing scratch data first")
+    args = parser.parse_args(argv)
+
+    workdir = os.path.abspath(args.workdir)
+    if os.path.exists(os.path.join(workdir, DATABASE_FILE)):
+        if not args.force:
+            parser.error(f"{workdir} already has a dataset, pass --force to regenerate")
+        shutil.rmtree(workdir)
+
+    prepare_workdir(workdir)
+    print(json.dumps(asyncio.run(generate(args)), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""
+Нагрузочный прогон по набору данных из benchmarks.dataset.
+
+    python -m benchmarks.load --concurrency 16 --requests 2000 --output before.json
+    python -m benchmarks.load --url http://127.0.0.1:8090 --server-pid 1234 --output after.json
+
+Без --url запросы идут через тестовый клиент Quart в этом же процессе
+(измеряется приложение без сетевого стека, peak RSS - процесса приложения).
+С --url используется локальный сервер, запущенный с той же базой:
+FANBASE_CONFIG=benchmarks/.scratch/config.json python -m backend
+Для каждого сценария выводятся пропускная способность, p50/p95/p99 и ошибки.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import random
+import sqlite3
+import time
+import uuid
+from urllib.parse import quote, urlsplit
+
+from .common import (
+    DATABASE_FILE, DEFAULT_WORKDIR, git_revision, peak_rss_mb, percentile, prepare_workdir, process_peak_rss_mb,
+)
+
+SCENARIOS = ("index", "person", "wiki", "get_quotes", "get_all_quote", "image_serve", "image_upload")
+
+
+class Targets:
+    """Случайные, но воспроизводимые при одном seed цели запросов из базы набора данных"""
+
+    def __init__(self, database_path: str, rng: random.Random, sample_size: int = 500) -> None:
+        self.rng = rng
+        with sqlite3.connect(database_path) as conn:
+            self.persons = conn.execute(
+                "SELECT id, full_name FROM person ORDER BY random() LIMIT ?", (sample_size,)
+            ).fetchall()
+            self.wiki_persons = [row[0] for row in conn.execute(
+                "SELECT person.full_name FROM wiki JOIN person ON person.id = wiki.person_id "
+                "ORDER BY random() LIMIT ?", (sample_size,)
+            )]
+            self.wiki_ids = [row[0] for row in conn.execute("SELECT id FROM wiki LIMIT ?", (sample_size,))]
+            self.image_ids = [row[0] for row in conn.execute("SELECT id FROM wiki_images LIMIT ?", (sample_size,))]
+            self.max_quote_id = conn.execute("SELECT coalesce(max(id), 0) FROM quotes").fetchone()[0]
+
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.new("RGB", (800, 600), (120, 80, 40)).save(buffer, "JPEG", quality=85)
+        self.upload_image = buffer.getvalue()
+
+    def request(self, scenario: str):
+        """(метод, путь, файл для загрузки или None)"""
+        rng = self.rng
+        if scenario == "index":
+            return "GET", "/", None
+        if scenario == "person":
+            return "GET", "/" + quote(rng.choice(self.persons)[1]), None
+        if scenario == "wiki":
+            return "GET", "/wiki/" + quote(rng.choice(self.wiki_persons)), None
+        if scenario == "get_quotes":
+            return "GET", f"/api/v1/get_quotes?person_id={rng.choice(self.persons)[0]}", None
+        if scenario == "get_all_quote":
+            return "GET", f"/api/v1/get_all_quote?after_id={rng.randrange(self.max_quote_id or 1)}&limit=100", None
+        if scenario == "image_serve":
+            return "GET", f"/api/v1/wiki/images/{rng.choice(self.image_ids)}/file?size=thumb", None
+        if scenario == "image_upload":
+            # Каждый раз новые байты, чтобы не попадать в дедупликацию
+            data = self.upload_image + uuid.uuid4().bytes
+            return "POST", f"/api/v1/wiki/{rng.choice(self.wiki_ids)}/images", data
+        raise ValueError(f"Unknown scenario: {scenario}")
+
+    def available(self, scenario: str) -> bool:
+        if scenario == "wiki":
+            return bool(self.wiki_persons)
+        if scenario == "image_serve":
+            return bool(self.image_ids)
+        if scenario == "image_upload":
+            return bool(self.wiki_ids)
+        return bool(self.persons)
+
+
+class TestClientTransport:
+    def __init__(self, app) -> None:
+        self.client = app.test_client()
+
+    async def send(self, method: str, path: str, upload) -> int:
+        from werkzeug.datastructures import FileStorage
+
+        if upload is None:
+            response = await self.client.open(path, method=method)
+        else:
+            files = {"image": FileStorage(io.BytesIO(upload), filename="bench.jpg", content_type="image/jpeg")}
+            response = await self.client.open(path, method=method, files=files)
+        await response.get_data()
+        return response.status_code
+
+    async def close(self) -> None:
+        pass
+
+
+class HttpTransport:
+    """Минимальный клиент HTTP/1.1 с keep-alive: по соединению на воркер"""
+
+    def __init__(self, url: str) -> None:
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.connections = []
+
+    async def _connection(self):
+        if self.connections:
+            return self.connections.pop()
+        return await asyncio.open_connection(self.host, self.port)
+
+    async def send(self, method: str, path: str, upload) -> int:
+        reader, writer = await self._connection()
+        headers = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}"]
+        body = b""
+        if upload is not None:
+            boundary = uuid.uuid4().hex
+            body = (
+                f"--{boundary}\r\nContent-Disposition: form-data; name=\"image\"; filename=\"bench.jpg\"\r\n"
+                f"Content-Type: image/jpeg\r\n\r\n"
+            ).encode() + upload + f"\r\n--{boundary}--\r\n".encode()
+            headers.append(f"Content-Type: multipart/form-data; boundary={boundary}")
+        headers.append(f"Content-Length: {len(body)}")
+        writer.write(("\r\n".join(headers) + "\r\n\r\n").encode() + body)
+
+        status = int((await reader.readline()).split()[1])
+        length, chunked, close = 0, False, False
+        while (line := await reader.readline()) not in (b"\r\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            name, value = name.strip().lower(), value.strip().lower()
+            if name == "content-length":
+                length = int(value)
+            elif name == "transfer-encoding" and "chunked" in value:
+                chunked = True
+            elif name == "connection" and value == "close":
+                close = True
+
+        if chunked:
+            while (size := int((await reader.readline()).split(b";")[0], 16)) > 0:
+                await reader.readexactly(size + 2)
+            await reader.readline()
+        elif length:
+            await reader.readexactly(length)
+
+        if close:
+            writer.close()
+        else:
+            self.connections.append((reader, writer))
+        return status
+
+    async def close(self) -> None:
+        for _, writer in self.connections:
+            writer.close()
+
+
+async def run_scenario(transport, targets: Targets, scenario: str, requests: int, concurrency: int) -> dict:
+    latencies, errors = [], 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            method, path, upload = targets.request(scenario)
+            started = time.perf_counter()
+            try:
+                status = await transport.send(method, path, upload)
+            except Exception:
+                status = 599
+            latencies.append(time.perf_counter() - started)
+            if status >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "elapsed": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+async def run(args) -> dict:
+    targets = Targets(os.path.join(os.getcwd(), DATABASE_FILE), random.Random(args.seed))
+    scenarios = [scenario for scenario in args.scenarios if targets.available(scenario)]
+
+    if args.url:
+        transport = HttpTransport(args.url)
+        results = {
+            scenario: await run_scenario(transport, targets, scenario, args.requests, args.concurrency)
+            for scenario in scenarios
+        }
+        await transport.close()
+        peak_rss = process_peak_rss_mb(args.server_pid) if args.server_pid else None
+    else:
+        from backend.app import app
+        from backend import images
+
+        transport = TestClientTransport(app)
+        async with app.test_app():
+            # Прогрев: первые запросы заполняют кэши и пул
+            for scenario in scenarios:
+                await run_scenario(transport, targets, scenario, min(args.concurrency, args.requests), 1)
+            results = {
+                scenario: await run_scenario(transport, targets, scenario, args.requests, args.concurrency)
+                for scenario in scenarios
+            }
+        images.shutdown()
+        peak_rss = peak_rss_mb()
+
+    return {
+        "meta": {
+            "revision": git_revision(),
+            "target": args.url or "test-client",
+            "concurrency": args.concurrency,
+            "requests_per_scenario": args.requests,
+            "seed": args.seed,
+            "python": platform.python_version(),
+        },
+        "peak_rss_mb": peak_rss,
+        "scenarios": results,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workdir", default=DEFAULT_WORKDIR)
+    parser.add_argument("--url", help="base URL of a running server; default: in-process test client")
+    parser.add_argument("--server-pid", type=int, help="server process id, to report its peak RSS")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=1000, help="requests per scenario")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write JSON results to this file as well")
+    args = parser.parse_args(argv)
+
+    output = os.path.abspath(args.output) if args.output else None
+    if not os.path.exists(os.path.join(args.workdir, DATABASE_FILE)):
+        parser.error(f"No dataset in {args.workdir}, run python -m benchmarks.dataset first")
+    prepare_workdir(args.workdir)
+
+    result = json.dumps(asyncio.run(run(args)), indent=2)
+    print(result)
+    if output:
+        with open(output, "w") as output_file:
+            output_file.write(result + "\n")
+
+if __name__ == "__main__":
+    main()
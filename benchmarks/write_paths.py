@@ -0,0 +1,165 @@
+"""
+Микробенчмарк операций записи: прежний путь (SELECT + изменение или удаление
+ORM-объекта + commit + refresh) против одного UPDATE/DELETE ... RETURNING.
+
+Запуск из каталога с config.json (движок берется из него):
+    python -m benchmarks.write_paths --iterations 500
+
+Данные создаются во временных персонах и удаляются в конце.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from datetime import datetime
+
+from sqlalchemy import delete, select
+
+from backend.database import database, Person_operation, Quotes_operation, Search_operation, WIKI_operation
+from backend.database.database import Person, Quotes, Wiki, async_session, bump_person_version
+
+PREFIX = "__bench_write_paths__"
+
+
+# Прежние реализации, оставлены только для сравнения
+async def legacy_update_person(person_id: int, fullname: str):
+    async with async_session() as session:
+        person = (await session.execute(select(Person).where(Person.id == person_id))).scalar_one_or_none()
+        if person is None:
+            raise ValueError(f"Person with id {person_id} does not exist")
+        person.full_name = fullname
+        person.version = Person.version + 1
+        person.updated_at = datetime.utcnow()
+        await Search_operation.index_person(session, person)
+        await session.commit()
+        await session.refresh(person)
+        return person
+
+async def legacy_update_quote(quote_id: int, quote_text: str):
+    async with async_session() as session:
+        quote = (await session.execute(select(Quotes).where(Quotes.id == quote_id))).scalar_one_or_none()
+        if quote is None:
+            raise ValueError(f"Quote with id {quote_id} does not exist")
+        quote.quote = quote_text
+        await session.execute(bump_person_version(quote.person_id))
+        await Search_operation.index_quote(session, quote)
+        await session.commit()
+        await session.refresh(quote)
+        return quote
+
+async def legacy_update_wiki(wiki_id: int, description: str):
+    async with async_session() as session:
+        wiki = (await session.execute(select(Wiki).where(Wiki.id == wiki_id))).scalar_one_or_none()
+        if wiki is None:
+            raise ValueError(f"Wiki entry with id {wiki_id} does not exist")
+        wiki.description = description
+        wiki.updated_at = datetime.utcnow()
+        await session.execute(bump_person_version(wiki.person_id))
+        await Search_operation.index_wiki(session, wiki)
+        await session.commit()
+        await session.refresh(wiki)
+        return wiki
+
+async def legacy_delete_person(person_id: int):
+    async with async_session() as session:
+        person = (await session.execute(select(Person).where(Person.id == person_id))).scalar_one_or_none()
+        if person is None:
+            raise ValueError(f"Person with id {person_id} does not exist")
+        await session.delete(person)
+        await Search_operation.remove_person(session, person_id)
+        await session.commit()
+        return True
+
+async def legacy_delete_quote(quote_id: int):
+    async with async_session() as session:
+        quote = (await session.execute(select(Quotes).where(Quotes.id == quote_id))).scalar_one_or_none()
+        if quote is None:
+            raise ValueError(f"Quote with id {quote_id} does not exist")
+        await session.delete(quote)
+        await session.execute(bump_person_version(quote.person_id, quote_count=Person.quote_count - 1))
+        await Search_operation.remove_quote(session, quote_id)
+        await session.commit()
+        return True
+
+
+async def _timed(calls) -> dict:
+    samples = []
+    for call in calls:
+        started = time.perf_counter()
+        await call()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "p50_ms": round(samples[len(samples) // 2], 3),
+        "p95_ms": round(samples[int(len(samples) * 0.95) - 1], 3),
+    }
+
+async def run(iterations: int) -> dict:
+    await database.init_db()
+    await Search_operation.init_search_index()
+
+    person = await Person_operation.create_person(f"{PREFIX} person")
+    wiki = await WIKI_operation.create_wiki("bench", person.id, "bench")
+    quotes = [await Quotes_operation.create_quote(f"bench {i}", person.id) for i in range(iterations * 2)]
+    legacy_quotes, new_quotes = quotes[:iterations], quotes[iterations:]
+    # Удалить можно только персону без цитат и wiki
+    empty = [await Person_operation.create_person(f"{PREFIX} empty {i}") for i in range(iterations * 2)]
+    legacy_empty, new_empty = empty[:iterations], empty[iterations:]
+
+    try:
+        results = {
+            "update_person": {
+                "legacy": await _timed(
+                    lambda i=i: legacy_update_person(person.id, f"{PREFIX} {i}") for i in range(iterations)
+                ),
+                "returning": await _timed(
+                    lambda i=i: Person_operation.update_person(person.id, f"{PREFIX} {i}") for i in range(iterations)
+                ),
+            },
+            "update_quote": {
+                "legacy": await _timed(
+                    lambda q=q: legacy_update_quote(q.id, "edited") for q in legacy_quotes
+                ),
+                "returning": await _timed(
+                    lambda q=q: Quotes_operation.update_quote(q.id, "edited") for q in new_quotes
+                ),
+            },
+            "update_wiki": {
+                "legacy": await _timed(
+                    lambda i=i: legacy_update_wiki(wiki.id, f"bench {i}") for i in range(iterations)
+                ),
+                "returning": await _timed(
+                    lambda i=i: WIKI_operation.update_wiki(wiki.id, f"bench {i}") for i in range(iterations)
+                ),
+            },
+            "delete_quote": {
+                "legacy": await _timed(lambda q=q: legacy_delete_quote(q.id) for q in legacy_quotes),
+                "returning": await _timed(lambda q=q: Quotes_operation.delete_quote(q.id) for q in new_quotes),
+            },
+            "delete_person": {
+                "legacy": await _timed(lambda p=p: legacy_delete_person(p.id) for p in legacy_empty),
+                "returning": await _timed(lambda p=p: Person_operation.delete_person(p.id) for p in new_empty),
+            },
+        }
+    finally:
+        async with async_session() as session:
+            await session.execute(delete(Quotes).where(Quotes.person_id == person.id))
+            await session.execute(delete(Wiki).where(Wiki.person_id == person.id))
+            # Персоны без цитат, оставшиеся после прерванного запуска
+            await session.execute(delete(Person).where(Person.id.in_([p.id for p in empty])))
+            await session.commit()
+        await Person_operation.delete_person(person.id)
+        await Search_operation.rebuild_search_index()
+
+    return {"engine": database.engine.dialect.name, "iterations": iterations, "operations": results}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args(argv)
+    print(json.dumps(asyncio.run(run(args.iterations)), indent=2))
+
+if __name__ == "__main__":
+    main()
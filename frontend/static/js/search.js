@@ -19,3 +19,60 @@ function searchFunction() {
         quoteCard.style.display = text.includes(input) || input === '' ? '' : 'none';
     });
 }
+
+// Поиск на сервере: /api/v1/search, результаты выводятся под строкой поиска
+let searchTimer = null;
+
+function renderSearchResults(results) {
+    let box = document.getElementById('search-results');
+    if (!box) {
+        box = document.createElement('div');
+        box.id = 'search-results';
+        box.className = 'list-group search-results';
+        document.getElementById('search').insertAdjacentElement('afterend', box);
+    }
+    box.replaceChildren();
+
+    results.forEach((result) => {
+        const item = document.createElement('a');
+        item.className = 'list-group-item list-group-item-action';
+        item.href = result.kind === 'wiki'
+            ? `/wiki/${encodeURIComponent(result.full_name)}`
+            : `/${encodeURIComponent(result.full_name)}`;
+
+        const title = document.createElement('b');
+        title.textContent = result.full_name || '';
+        item.appendChild(title);
+
+        if (result.kind !== 'person') {
+            const text = document.createElement('div');
+            text.textContent = result.snippet;
+            item.appendChild(text);
+        }
+        box.appendChild(item);
+    });
+}
+
+function serverSearch() {
+    const input = document.getElementById('search').value.trim();
+    clearTimeout(searchTimer);
+
+    if (input.length < 2) {
+        renderSearchResults([]);
+        return;
+    }
+
+    searchTimer = setTimeout(() => {
+        fetch(`/api/v1/search?q=${encodeURIComponent(input)}&per_page=10`)
+            .then((response) => response.json())
+            .then((data) => renderSearchResults(data.results || []))
+            .catch(() => renderSearchResults([]));
+    }, 250);
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+    const search = document.getElementById('search');
+    if (search) {
+        search.addEventListener('input', serverSearch);
+    }
+});